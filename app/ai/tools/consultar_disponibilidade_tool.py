@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import time as time_mod
+from contextlib import aclosing
 from dataclasses import dataclass
 from datetime import datetime, timedelta, time
 from typing import Any, Dict, List, Optional, Tuple
@@ -8,7 +11,10 @@ from typing import Any, Dict, List, Optional, Tuple
 from langchain_core.tools import tool
 
 from app.ai.tools.shared import _tool_result, _normalize_service_term
-from app.utils.http_client import get_http_client
+from app.services.agenda import AgendaIndex, get_agenda_cache, iter_agendamentos_by_day, parse_dt
+from app.services.catalog import get_service_catalog
+from app.services.eligibility import get_eligibility_index
+from app.services.shared_cache import load_profissionais, load_servicos_do_profissional
 
 logger = logging.getLogger(__name__)
 
@@ -22,20 +28,18 @@ SLOT_STEP_MIN = 30
 # Se quiser ignorar domingo:
 IGNORE_WEEKDAY = {6}  # 0=Mon ... 6=Sun (domingo)
 
+# Fan-out de elegibilidade (/profissionais/{id}/servicos)
+ELIGIBILITY_CONCURRENCY = 8
+# Para de consultar assim que houver profissionais aptos suficientes
+ELIGIBILITY_TARGET = 10
+
 
 # -----------------------------
 # Helpers
 # -----------------------------
-def _parse_dt(dt_str: str) -> datetime:
-    # Suporta ISO com timezone (ex: 2026-01-20T14:00:00-03:00)
-    return datetime.fromisoformat(dt_str.replace("Z", "+00:00"))
-
 def _to_iso(dt: datetime) -> str:
     return dt.isoformat()
 
-def _overlap(a_start: datetime, a_end: datetime, b_start: datetime, b_end: datetime) -> bool:
-    return a_start < b_end and b_start < a_end
-
 def _day_start_end(dt: datetime) -> Tuple[datetime, datetime]:
     # faixa do dia em timezone do dt
     start = dt.replace(hour=0, minute=0, second=0, microsecond=0)
@@ -65,190 +69,175 @@ def _safe_int(v: Any) -> Optional[int]:
 
 
 # -----------------------------
-# HTTP helpers (sem tool->tool)
+# Helpers de catálogo (sem tool->tool)
 # -----------------------------
-def _http_get(path: str, params: Dict[str, Any]) -> Dict[str, Any]:
-    http = get_http_client()
-    return http.get(path, params=params)
-
-def _fetch_servicos(nome: Optional[str], somente_visiveis: Optional[bool], incluir_valor: bool) -> List[Dict[str, Any]]:
-    params: Dict[str, Any] = {"page": 1, "pageSize": 200}
-    if nome:
-        params["nome"] = _normalize_service_term(nome)
-    if somente_visiveis is not None:
-        params["somenteVisiveisCliente"] = bool(somente_visiveis)
-
-    resp = _http_get("/servicos", params=params)
-    data = resp.get("data", []) or []
+def _service_view(service: Dict[str, Any], incluir_valor: bool) -> Dict[str, Any]:
     # compact básico (mantém campos necessários)
-    out = []
-    for s in data:
-        out.append({
-            "id": s.get("id"),
-            "nome": s.get("nome"),
-            "descricao": s.get("descricao"),
-            "categoria": s.get("categoria"),
-            "duracaoEmMinutos": s.get("duracaoEmMinutos"),
-            "preco": s.get("preco") if incluir_valor else None,
-            "visivelParaCliente": s.get("visivelParaCliente"),
-        })
-    return out
-
-def _fetch_profissionais() -> List[Dict[str, Any]]:
-    resp = _http_get("/profissionais", params={"page": 1, "pageSize": 200})
-    data = resp.get("data", []) or []
-    return [{"id": p.get("id"), "nome": p.get("nome"), "apelido": p.get("apelido")} for p in data]
-
-def _fetch_servicos_por_profissional(profissional_id: int, incluir_valor: bool) -> List[Dict[str, Any]]:
-    resp = _http_get(f"/profissionais/{profissional_id}/servicos", params={"page": 1, "pageSize": 200})
-    data = resp.get("data", []) or []
-    out = []
-    for s in data:
-        out.append({
-            "id": s.get("id"),
-            "nome": s.get("nome"),
-            "duracaoEmMinutos": s.get("duracaoEmMinutos"),
-            "preco": s.get("preco") if incluir_valor else None,
-            "visivelParaCliente": s.get("visivelParaCliente"),
-        })
-    return out
-
-def _fetch_agendamentos(data_inicio_iso: str, data_fim_iso: str) -> List[Dict[str, Any]]:
-    resp = _http_get("/agendamentos", params={
-        "dataInicio": data_inicio_iso,
-        "dataFim": data_fim_iso,
-        "page": 1,
-        "pageSize": 500
-    })
-    return resp.get("data", []) or []
+    return {**service, "preco": service.get("preco") if incluir_valor else None}
 
+async def _fetch_profissionais() -> List[Dict[str, Any]]:
+    return list(await load_profissionais())
 
-# -----------------------------
-# Matching do serviço (v1)
-# -----------------------------
-def _pick_service_by_id(services: List[Dict[str, Any]], servico_id: int) -> Optional[Dict[str, Any]]:
-    for s in services:
-        if s.get("id") == servico_id:
-            return s
-    return None
-
-def _pick_service_by_term(services: List[Dict[str, Any]], term: str) -> Optional[Dict[str, Any]]:
-    t = _normalize_service_term(term).lower().strip()
-    if not t:
-        return None
+async def _fetch_servicos_por_profissional(profissional_id: int, incluir_valor: bool) -> List[Dict[str, Any]]:
+    servicos = await load_servicos_do_profissional(profissional_id)
+    return [_service_view(s, incluir_valor) for s in servicos]
 
-    # 1) match exato
-    for s in services:
-        if str(s.get("nome", "")).lower().strip() == t:
-            return s
-
-    # 2) contains
-    contains = [s for s in services if t in str(s.get("nome", "")).lower()]
-    if contains:
-        # pega o mais curto (tende a ser o “mais específico”)
-        contains.sort(key=lambda x: len(str(x.get("nome", ""))))
-        return contains[0]
-
-    # 3) fallback: palavras
-    words = [w for w in t.split() if len(w) >= 3]
-    scored: List[Tuple[int, Dict[str, Any]]] = []
-    for s in services:
-        name = str(s.get("nome", "")).lower()
-        score = sum(1 for w in words if w in name)
-        if score > 0:
-            scored.append((score, s))
-    if scored:
-        scored.sort(key=lambda x: (-x[0], len(str(x[1].get("nome", "")))))
-        return scored[0][1]
-
-    return None
+async def _find_eligible_professionals(
+    profissionais: List[Dict[str, Any]],
+    servico_id: Any,
+    incluir_valor: bool,
+    target: int = ELIGIBILITY_TARGET,
+    concurrency: int = ELIGIBILITY_CONCURRENCY,
+) -> List[Dict[str, Any]]:
+    """
+    Consulta os serviços de cada profissional em paralelo (limitado por semáforo)
+    e devolve os aptos na ordem original. Para assim que os `target` primeiros
+    aptos na ordem da lista estiverem definidos (todos os anteriores resolvidos),
+    então o resultado não depende de qual chamada termina primeiro; o restante
+    é cancelado.
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+    timings: List[Tuple[int, float]] = []
+
+    async def _check(idx: int, p: Dict[str, Any]) -> Tuple[int, bool]:
+        async with sem:
+            started = time_mod.perf_counter()
+            try:
+                servs = await _fetch_servicos_por_profissional(p["id"], incluir_valor=incluir_valor)
+            except Exception:
+                logger.warning("[tool] elegibilidade falhou profissionalId=%s", p.get("id"), exc_info=True)
+                servs = []
+            finally:
+                timings.append((p["id"], (time_mod.perf_counter() - started) * 1000))
+        return idx, any(s.get("id") == servico_id for s in servs)
+
+    wall_started = time_mod.perf_counter()
+    tasks = [asyncio.create_task(_check(i, p)) for i, p in enumerate(profissionais)]
+    results: List[Optional[bool]] = [None] * len(profissionais)
+    found: List[int] = []
+    # prefixo da lista já resolvido (results[:resolved] todos definidos)
+    resolved = 0
+    try:
+        for fut in asyncio.as_completed(tasks):
+            idx, ok = await fut
+            results[idx] = ok
+            while resolved < len(results) and results[resolved] is not None:
+                if results[resolved]:
+                    found.append(resolved)
+                resolved += 1
+            if target and len(found) >= target:
+                break
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if target:
+        found = found[:target]
+
+    wall_ms = (time_mod.perf_counter() - wall_started) * 1000
+    for pid, ms in timings:
+        logger.debug("[tool] elegibilidade profissionalId=%s %.1fms", pid, ms)
+    logger.info(
+        "[tool] elegibilidade calls=%s eligible=%s wall=%.1fms max_call=%.1fms",
+        len(timings),
+        len(found),
+        wall_ms,
+        max((ms for _, ms in timings), default=0.0),
+    )
+    return [profissionais[i] for i in found]
 
 
 # -----------------------------
 # Disponibilidade (v1)
 # -----------------------------
-def _agendamento_interval(ag: Dict[str, Any]) -> Optional[Tuple[datetime, datetime]]:
-    start_raw = ag.get("dataHoraInicio")
-    dur = ag.get("duracaoEmMinutos")
-    if not start_raw or dur is None:
-        return None
-    try:
-        start = _parse_dt(start_raw)
-        end = start + timedelta(minutes=int(dur))
-        return start, end
-    except Exception:
-        return None
-
-def _is_slot_free(
-    slot_start: datetime,
-    slot_end: datetime,
-    agendamentos: List[Dict[str, Any]],
-    profissional_id: int,
-) -> bool:
-    for ag in agendamentos:
-        prof = (ag.get("profissional") or {}).get("id")
-        if prof != profissional_id:
-            continue
-        itv = _agendamento_interval(ag)
-        if not itv:
-            continue
-        ag_start, ag_end = itv
-        if _overlap(slot_start, slot_end, ag_start, ag_end):
-            return False
-    return True
+def _candidate_starts(base_dt: datetime, day_cursor: datetime, dur_min: int) -> List[datetime]:
+    """Inícios candidatos do dia, em ordem (expediente, passo SLOT_STEP_MIN)."""
+    if day_cursor.weekday() in IGNORE_WEEKDAY:
+        return []
+
+    work_start, work_end = _build_day_work_window(day_cursor)
+    # começa no "agora" arredondado (no primeiro dia) ou no inicio do expediente
+    if day_cursor.date() == base_dt.date():
+        cursor = _round_up_to_step(max(base_dt, work_start), SLOT_STEP_MIN)
+    else:
+        cursor = work_start
+
+    starts: List[datetime] = []
+    while cursor + timedelta(minutes=dur_min) <= work_end:
+        starts.append(cursor)
+        cursor += timedelta(minutes=SLOT_STEP_MIN)
+    return starts
 
 def _suggest_slots(
     base_dt: datetime,
-    dias_busca: int,
+    day_cursor: datetime,
     sugestoes: int,
     dur_min: int,
     profissionais: List[Dict[str, Any]],
-    agendamentos: List[Dict[str, Any]],
+    agenda: AgendaIndex,
 ) -> List[Dict[str, Any]]:
-    suggestions: List[Dict[str, Any]] = []
-
-    # varrer dias
-    day_cursor = base_dt
-    for _ in range(dias_busca):
-        if day_cursor.weekday() in IGNORE_WEEKDAY:
-            day_cursor = (day_cursor + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-            continue
-
-        work_start, work_end = _build_day_work_window(day_cursor)
-        # começa no "agora" arredondado (no primeiro dia) ou no inicio do expediente
-        if day_cursor.date() == base_dt.date():
-            cursor = _round_up_to_step(max(base_dt, work_start), SLOT_STEP_MIN)
-        else:
-            cursor = work_start
-
-        while cursor + timedelta(minutes=dur_min) <= work_end:
-            slot_start = cursor
-            slot_end = cursor + timedelta(minutes=dur_min)
-
-            # tenta achar algum profissional livre
-            for p in profissionais:
-                pid = p["id"]
-                if _is_slot_free(slot_start, slot_end, agendamentos, pid):
-                    suggestions.append({
-                        "profissionalId": pid,
-                        "profissionalNome": p.get("nome"),
-                        "start": _to_iso(slot_start),
-                        "end": _to_iso(slot_end),
-                    })
-                    break
-
-            if len(suggestions) >= sugestoes:
-                return suggestions
+    if sugestoes <= 0:
+        return []
 
-            cursor += timedelta(minutes=SLOT_STEP_MIN)
+    # Um dia por vez (a agenda chega em streaming): bisect no AgendaIndex com
+    # parada antecipada sai mais barato que montar um bitmap por dia.
+    suggestions: List[Dict[str, Any]] = []
+    for slot_start in _candidate_starts(base_dt, day_cursor, dur_min):
+        slot_end = slot_start + timedelta(minutes=dur_min)
+        for p in profissionais:
+            if agenda.is_free(p["id"], slot_start, slot_end):
+                suggestions.append({
+                    "profissionalId": p["id"],
+                    "profissionalNome": p.get("nome"),
+                    "start": _to_iso(slot_start),
+                    "end": _to_iso(slot_end),
+                })
+                break
+        if len(suggestions) >= sugestoes:
+            break
+    return suggestions
 
-        day_cursor = (day_cursor + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+def _check_requested(
+    data_hora_desejada: Optional[str],
+    dur_min: int,
+    profissional_id: Optional[int],
+    eligible: List[Dict[str, Any]],
+    agenda: AgendaIndex,
+) -> Optional[Dict[str, Any]]:
+    if not data_hora_desejada:
+        return None
+    req_start = parse_dt(data_hora_desejada)
+    req_end = req_start + timedelta(minutes=dur_min)
+
+    if profissional_id is not None:
+        ok = agenda.is_free(int(profissional_id), req_start, req_end)
+        return {
+            "requestedStart": _to_iso(req_start),
+            "requestedEnd": _to_iso(req_end),
+            "available": ok,
+            "checkedProfessionalId": int(profissional_id),
+        }
 
-    return suggestions
+    # se não tem profissional escolhido, basta existir ao menos um livre
+    ok_any = False
+    ok_pid = None
+    for p in eligible:
+        if agenda.is_free(p["id"], req_start, req_end):
+            ok_any = True
+            ok_pid = p["id"]
+            break
+    return {
+        "requestedStart": _to_iso(req_start),
+        "requestedEnd": _to_iso(req_end),
+        "available": ok_any,
+        "suggestedProfessionalId": ok_pid,
+    }
 
 
 @tool
-def consultar_disponibilidade_tool(
+async def consultar_disponibilidade_tool(
     termoServico: str | None = None,
     servicoId: int | None = None,
     profissionalId: int | None = None,
@@ -269,37 +258,42 @@ def consultar_disponibilidade_tool(
         dataHoraDesejada,
     )
 
-    # 1) serviços (filtra por termo quando possível)
-    services = _fetch_servicos(nome=termoServico, somente_visiveis=somenteVisiveisCliente, incluir_valor=incluirValor)
-    if not services:
-        return _tool_result({"error": "Nenhum serviço encontrado"})
+    # 1) serviços: catálogo em memória (índice pré-construído)
+    catalog = get_service_catalog()
+    await catalog.ensure_loaded()
+    term = _normalize_service_term(termoServico) if termoServico else None
 
     # 2) resolve serviço
     chosen_service = None
     if servicoId is not None:
-        chosen_service = _pick_service_by_id(services, int(servicoId))
-    if chosen_service is None and termoServico:
-        chosen_service = _pick_service_by_term(services, termoServico)
+        chosen_service = catalog.get(int(servicoId), somente_visiveis=somenteVisiveisCliente)
+    if chosen_service is None and term:
+        chosen_service = catalog.pick(term, somente_visiveis=somenteVisiveisCliente)
 
     if chosen_service is None:
+        services = catalog.search(term, somente_visiveis=somenteVisiveisCliente)
+        if not services:
+            return _tool_result({"error": "Nenhum serviço encontrado"})
         # devolve candidatos pro agente pedir confirmação
         return _tool_result({
             "needsClarification": True,
             "message": "Não consegui identificar com certeza o serviço. Sugira ao cliente escolher um.",
-            "serviceCandidates": services[:10],
+            "serviceCandidates": [_service_view(s, incluirValor) for s in services[:10]],
         })
+    chosen_service = _service_view(chosen_service, incluirValor)
 
     dur_min = _safe_int(chosen_service.get("duracaoEmMinutos")) or 30
 
     # 3) profissionais (geral) + filtra os que fazem o serviço
-    all_prof = _fetch_profissionais()
+    #    índice em memória quando estiver válido; senão consulta a API
+    index = get_eligibility_index()
+    all_prof = index.list_profissionais()
+    if all_prof is None:
+        all_prof = await _fetch_profissionais()
     if not all_prof:
         return _tool_result({"error": "Nenhum profissional encontrado"})
 
     # para cada profissional, busca serviços e vê se tem o service id
-    eligible: List[Dict[str, Any]] = []
-    eligible_ids = set()
-
     # se o cliente já escolheu profissional, tentamos só ele primeiro (evita N chamadas)
     prof_to_check = []
     if profissionalId is not None:
@@ -309,12 +303,15 @@ def consultar_disponibilidade_tool(
     if not prof_to_check:
         prof_to_check = all_prof
 
-    for p in prof_to_check:
-        pid = p["id"]
-        servs = _fetch_servicos_por_profissional(pid, incluir_valor=incluirValor)
-        if any(s.get("id") == chosen_service["id"] for s in servs):
-            eligible.append(p)
-            eligible_ids.add(pid)
+    indexed_ids = index.professional_ids_for(chosen_service["id"])
+    if indexed_ids is not None:
+        eligible = [p for p in prof_to_check if p["id"] in indexed_ids]
+    else:
+        eligible = await _find_eligible_professionals(
+            prof_to_check,
+            chosen_service["id"],
+            incluir_valor=incluirValor,
+        )
 
     if not eligible:
         return _tool_result({
@@ -325,61 +322,57 @@ def consultar_disponibilidade_tool(
             "message": "Nenhum profissional realiza esse serviço no momento.",
         })
 
-    # 4) agendamentos para janela de busca
-    base_dt = _parse_dt(dataHoraDesejada) if dataHoraDesejada else datetime.now().astimezone()
+    # 4) agendamentos da janela, dia a dia (paginado, com prefetch dos próximos dias)
+    base_dt = parse_dt(dataHoraDesejada) if dataHoraDesejada else datetime.now().astimezone()
     window_start = base_dt.replace(hour=0, minute=0, second=0, microsecond=0)
-    window_end = window_start + timedelta(days=max(1, int(diasBusca)))
+    dias_busca = int(diasBusca)
 
-    ags = _fetch_agendamentos(_to_iso(window_start), _to_iso(window_end))
+    # se o cliente escolheu profissional, sugerimos só com ele
+    if profissionalId is not None:
+        eligible_for_suggest = [p for p in eligible if p["id"] == int(profissionalId)] or eligible
+    else:
+        eligible_for_suggest = eligible
 
-    # 5) checar slot desejado (se veio)
+    agenda = AgendaIndex()
     requested = None
-    if dataHoraDesejada:
-        req_start = _parse_dt(dataHoraDesejada)
-        req_end = req_start + timedelta(minutes=dur_min)
-
-        if profissionalId is not None:
-            ok = _is_slot_free(req_start, req_end, ags, int(profissionalId))
-            requested = {
-                "requestedStart": _to_iso(req_start),
-                "requestedEnd": _to_iso(req_end),
-                "available": ok,
-                "checkedProfessionalId": int(profissionalId),
-            }
-        else:
-            # se não tem profissional escolhido, basta existir ao menos um livre
-            ok_any = False
-            ok_pid = None
-            for p in eligible:
-                if _is_slot_free(req_start, req_end, ags, p["id"]):
-                    ok_any = True
-                    ok_pid = p["id"]
-                    break
-            requested = {
-                "requestedStart": _to_iso(req_start),
-                "requestedEnd": _to_iso(req_end),
-                "available": ok_any,
-                "suggestedProfessionalId": ok_pid,
-            }
-
-    # 6) sugestões: se não veio data, ou se veio mas não está disponível
-    need_suggest = (requested is None) or (requested is not None and requested.get("available") is False)
+    need_suggest = True
     suggested_slots: List[Dict[str, Any]] = []
-    if need_suggest:
-        # se o cliente escolheu profissional, sugerimos só com ele
-        if profissionalId is not None:
-            eligible_for_suggest = [p for p in eligible if p["id"] == int(profissionalId)] or eligible
-        else:
-            eligible_for_suggest = eligible
-
-        suggested_slots = _suggest_slots(
-            base_dt=base_dt,
-            dias_busca=int(diasBusca),
-            sugestoes=int(sugestoes),
-            dur_min=dur_min,
-            profissionais=eligible_for_suggest,
-            agendamentos=ags,
-        )
+
+    cache_stats: Dict[str, int] = {}
+    day_idx = -1
+    days_iter = iter_agendamentos_by_day(
+        window_start,
+        max(1, dias_busca),
+        cache=get_agenda_cache(),
+        stats=cache_stats,
+    )
+    async with aclosing(days_iter) as days:
+        async for day_start, day_ags in days:
+            day_idx += 1
+            agenda.add_many(day_ags)
+
+            if day_idx == 0:
+                # 5) checar slot desejado (se veio) — cai sempre no primeiro dia
+                requested = _check_requested(dataHoraDesejada, dur_min, profissionalId, eligible, agenda)
+                # 6) sugestões: se não veio data, ou se veio mas não está disponível
+                need_suggest = (requested is None) or (requested.get("available") is False)
+                if not need_suggest:
+                    break
+
+            if day_idx >= dias_busca:
+                break
+            day_cursor = base_dt if day_idx == 0 else day_start
+            suggested_slots.extend(_suggest_slots(
+                base_dt=base_dt,
+                day_cursor=day_cursor,
+                sugestoes=int(sugestoes) - len(suggested_slots),
+                dur_min=dur_min,
+                profissionais=eligible_for_suggest,
+                agenda=agenda,
+            ))
+            # já temos as sugestões pedidas: não busca os dias seguintes
+            if len(suggested_slots) >= int(sugestoes):
+                break
 
     return _tool_result({
         "service": chosen_service,
@@ -392,5 +385,6 @@ def consultar_disponibilidade_tool(
             "slotStepMin": SLOT_STEP_MIN,
             "openTime": DEFAULT_OPEN_TIME.strftime("%H:%M"),
             "closeTime": DEFAULT_CLOSE_TIME.strftime("%H:%M"),
+            "agendaCache": cache_stats,
         }
     })
@@ -5,13 +5,14 @@ import logging
 from langchain_core.tools import tool
 
 from app.ai.tools.shared import _compact_agendamento, _compact_response, _tool_result
+from app.services.agenda import get_agenda_cache, parse_dt
 from app.utils.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
 
 @tool
-def criar_agendamento_tool(
+async def criar_agendamento_tool(
     servicoId: str,
     profissionalId: str,
     clienteId: str,
@@ -65,5 +66,11 @@ def criar_agendamento_tool(
 
     logger.info("[tool] criar_agendamento_tool payload=%s", payload)
     http = get_http_client()
-    resp = http.post("/agendamentos", json=payload)
+    resp = await http.apost("/agendamentos", json=payload)
+
+    # o novo agendamento precisa aparecer já na próxima consulta de disponibilidade
+    try:
+        get_agenda_cache().invalidate_at(parse_dt(str(dataHoraInicio)))
+    except ValueError:
+        get_agenda_cache().clear()
     return _tool_result(_compact_response(resp, _compact_agendamento))
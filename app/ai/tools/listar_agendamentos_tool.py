@@ -12,7 +12,7 @@ logger = logging.getLogger(__name__)
 
 
 @tool
-def listar_agendamentos_tool(
+async def listar_agendamentos_tool(
     dataInicio: str,
     dataFim: str,
     page: int | None = 1,
@@ -30,5 +30,5 @@ def listar_agendamentos_tool(
 
     logger.info("[tool] listar_agendamentos_tool params=%s", params)
     http = get_http_client()
-    resp = http.get("/agendamentos", params=params)
+    resp = await http.aget("/agendamentos", params=params)
     return _tool_result(_compact_response(resp, _compact_agendamento))
@@ -11,7 +11,7 @@ logger = logging.getLogger(__name__)
 
 
 @tool
-def listar_profissionais_tool(page: int = 1, pageSize: int = 50) -> str:
+async def listar_profissionais_tool(page: int = 1, pageSize: int = 50) -> str:
     """Lista profissionais disponíveis de forma paginada."""
     params = {
         "page": page,
@@ -19,5 +19,5 @@ def listar_profissionais_tool(page: int = 1, pageSize: int = 50) -> str:
     }
     logger.info("[tool] listar_profissionais_tool params=%s", params)
     client = get_http_client()
-    resp = client.get("/profissionais", params=params)
+    resp = await client.aget("/profissionais", params=params)
     return _tool_result(_compact_response(resp, _compact_professional))
@@ -11,7 +11,7 @@ logger = logging.getLogger(__name__)
 
 
 @tool
-def listar_servicos_profissional_tool(
+async def listar_servicos_profissional_tool(
     profissionalId: int,
     page: int = 1,
     pageSize: int = 50,
@@ -35,7 +35,7 @@ def listar_servicos_profissional_tool(
         return _tool_result({"error": "Profissional não informado"})
 
     http = get_http_client()
-    resp = http.get(f"/profissionais/{profissionalId}/servicos", params=params)
+    resp = await http.aget(f"/profissionais/{profissionalId}/servicos", params=params)
     return _tool_result(
         _compact_response(resp, lambda item: _compact_service(item, incluirValor))
     )
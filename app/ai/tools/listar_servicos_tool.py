@@ -11,13 +11,35 @@ from app.ai.tools.shared import (
     _normalize_service_term,
     _tool_result,
 )
+from app.services.catalog import get_service_catalog
 from app.utils.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
 
+async def _from_catalog(
+    *,
+    nome: str | None,
+    categoria: str | None,
+    somente_visiveis: bool | None,
+    page: int,
+    page_size: int,
+) -> Dict[str, Any]:
+    """Filtra e pagina localmente a partir do catálogo em memória."""
+    catalog = get_service_catalog()
+    await catalog.ensure_loaded()
+    items = catalog.search(nome, categoria=categoria, somente_visiveis=somente_visiveis)
+    start = (max(1, page) - 1) * page_size
+    return {
+        "data": items[start:start + page_size],
+        "page": page,
+        "pageSize": page_size,
+        "total": len(items),
+    }
+
+
 @tool
-def listar_servicos_tool(
+async def listar_servicos_tool(
     nome: str | None = None,
     categoria: str | None = None,
     somenteVisiveisCliente: bool | None = None,
@@ -41,8 +63,18 @@ def listar_servicos_tool(
     if somenteVisiveisCliente is not None:
         params["somenteVisiveisCliente"] = bool(somenteVisiveisCliente)
 
-    http = get_http_client()
-    resp = http.get("/servicos", params=params)
+    try:
+        resp = await _from_catalog(
+            nome=params.get("nome"),
+            categoria=params.get("categoria"),
+            somente_visiveis=somenteVisiveisCliente,
+            page=page or 1,
+            page_size=pageSize or 50,
+        )
+    except Exception:
+        logger.warning("[tool] listar_servicos_tool catálogo indisponível, consultando API", exc_info=True)
+        http = get_http_client()
+        resp = await http.aget("/servicos", params=params)
     return _tool_result(
         _compact_response(resp, lambda item: _compact_service(item, incluirValor))
     )
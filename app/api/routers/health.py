@@ -1,12 +1,25 @@
 from __future__ import annotations
 
-from typing import Dict
+from typing import Any, Dict
 
 from fastapi import APIRouter
 
+from app.services.shared_cache import get_shared_cache
+from app.services.user_profile_cache import get_user_profile_cache
+from app.utils.http_client import http_client_metrics
+
 router = APIRouter(tags=["health"])
 
 
 @router.get("/health")
 async def health() -> Dict[str, str]:
     return {"status": "ok"}
+
+
+@router.get("/metrics")
+async def metrics() -> Dict[str, Any]:
+    return {
+        "http_client": http_client_metrics(),
+        "catalog_cache": get_shared_cache().metrics(),
+        "user_profile_cache": get_user_profile_cache().metrics(),
+    }
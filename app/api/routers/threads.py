@@ -2,9 +2,10 @@ from __future__ import annotations
 
 import json
 import uuid
-from typing import Any, Dict, List
+from collections import Counter
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from fastapi.responses import StreamingResponse
 
 from langchain_core.messages import (
@@ -15,18 +16,26 @@ from langchain_core.messages import (
     BaseMessage,
 )
 
+from psycopg import errors as pg_errors
+
 from app.db.threads import (
     get_thread_created_at,
     insert_thread,
+    insert_threads,
     list_threads,
 )
 from app.models.schemas import (
     RunRequest,
     RunResponse,
     RunResult,
+    ThreadBatchCreate,
+    ThreadBatchResponse,
+    ThreadBatchResult,
     ThreadObj,
     ThreadSearchRequest,
 )
+from app.services.thread_history import InvalidCursorError, load_thread_messages, window_messages
+from app.utils.cursor import parse_cursor_or_400, set_next_cursor
 from app.utils.lc import lc_messages_to_list
 
 
@@ -87,6 +96,26 @@ def sse_payload(data: Dict[str, Any]) -> str:
     return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
+def messages_from_state(state: Any) -> Optional[List[BaseMessage]]:
+    """Mensagens do estado final devolvido pelo grafo (ainvoke / on_chain_end da raiz)."""
+    if isinstance(state, dict):
+        msgs = state.get("messages")
+        if isinstance(msgs, list):
+            return msgs
+    return None
+
+
+async def final_messages(checkpointer: Any, thread_id: str, state: Any = None) -> List[BaseMessage]:
+    """
+    Mensagens finais do run: usa o estado que o grafo já devolveu e só relê o
+    checkpoint (round trip + desserialização) se ele não vier.
+    """
+    msgs = messages_from_state(state)
+    if msgs is not None:
+        return msgs
+    return await load_thread_messages(checkpointer, thread_id)
+
+
 def get_graph_or_500(request: Request):
     graph = getattr(request.app.state, "graph", None)
     if graph is None:
@@ -105,38 +134,92 @@ def get_checkpointer_or_500(request: Request):
 async def create_thread(request: Request) -> ThreadObj:
     """Cria um identificador novo para conversas no banco."""
     thread_id = str(uuid.uuid4())
-    await insert_thread(thread_id)
-    created = await get_thread_created_at(thread_id)
+    created = await insert_thread(thread_id)
     return ThreadObj(thread_id=thread_id, created_at=created, values={"messages": []})
 
 
+@router.post("/threads/batch", response_model=ThreadBatchResponse)
+async def create_threads_batch(request: Request, body: ThreadBatchCreate) -> ThreadBatchResponse:
+    """
+    Cria vários threads em um único statement (onboarding em lote do n8n).
+
+    Envie `count` (threads sem usuário) ou `user_ids` (um thread por item, já
+    vinculado; itens null ficam sem usuário). O resultado vem por item, na
+    ordem de entrada: created, exists, duplicate ou user_not_found (perfil
+    inexistente; só esse item fica sem thread).
+    """
+    if (body.count is None) == (body.user_ids is None):
+        raise HTTPException(status_code=400, detail="Informe count ou user_ids")
+    n = body.count if body.count is not None else len(body.user_ids or [])
+    if n == 0:
+        return ThreadBatchResponse(total=0)
+
+    thread_ids = [str(uuid.uuid4()) for _ in range(n)]
+    try:
+        rows = await insert_threads(thread_ids, body.user_ids)
+    except pg_errors.ForeignKeyViolation:
+        # perfil apagado entre a checagem e o insert
+        raise HTTPException(status_code=404, detail="User profile not found")
+
+    results = [
+        ThreadBatchResult(index=r.idx, outcome=r.outcome, thread_id=r.thread_id, created_at=r.created_at)
+        for r in rows
+    ]
+    return ThreadBatchResponse(
+        total=len(results),
+        counts=dict(Counter(r.outcome for r in results)),
+        results=results,
+    )
+
+
 @router.post("/threads/search")
-async def search_threads(request: Request, req: ThreadSearchRequest) -> List[ThreadObj]:
-    """Lista threads recentes para permitir seleção no frontend."""
-    rows = await list_threads(limit=req.limit or 50)
-    return [ThreadObj(thread_id=t, created_at=ts, values={"messages": []}) for t, ts in rows]
+async def search_threads(request: Request, response: Response, req: ThreadSearchRequest) -> List[ThreadObj]:
+    """
+    Lista threads recentes para permitir seleção no frontend.
+
+    Paginação keyset: se houver mais itens, o header X-Next-Cursor traz o
+    cursor a ser enviado em `cursor` na próxima chamada.
+    """
+    after = parse_cursor_or_400(req.cursor)
+    rows, next_key = await list_threads(limit=req.limit or 50, after=after)
+    set_next_cursor(response, next_key)
+    return [ThreadObj(thread_id=t.thread_id, created_at=t.created_at, values={"messages": []}) for t in rows]
 
 
 @router.get("/threads/{thread_id}")
-async def get_thread(request: Request, thread_id: str) -> ThreadObj:
-    """Retorna histórico salvo para um thread específico."""
+async def get_thread(
+    request: Request,
+    thread_id: str,
+    limit: Optional[int] = Query(default=None, ge=1, le=500),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+) -> ThreadObj:
+    """
+    Retorna histórico salvo para um thread específico.
+
+    limit/before/after recortam uma janela usando ids de mensagem como cursor
+    (sem parâmetros: histórico completo). Os dados de paginação vão em values.page.
+    """
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Use apenas um cursor: before ou after")
     checkpointer = get_checkpointer_or_500(request)
 
     created = await get_thread_created_at(thread_id)
-    cfg = {"configurable": {"thread_id": thread_id}}
 
     try:
-        tup = await checkpointer.aget_tuple(cfg)
-        msgs: List[BaseMessage] = []
-        if tup and tup.checkpoint:
-            msgs = tup.checkpoint.get("channel_values", {}).get("messages", []) or []
+        msgs = await load_thread_messages(checkpointer, thread_id)
     except Exception:
         msgs = []
 
+    try:
+        window, page = window_messages(msgs, limit=limit, before=before, after=after)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
     return ThreadObj(
         thread_id=thread_id,
         created_at=created,
-        values={"messages": lc_messages_to_list(msgs)},
+        values={"messages": lc_messages_to_list(window), "page": page},
     )
 
 
@@ -149,12 +232,8 @@ async def run_and_wait(request: Request, thread_id: str, body: RunRequest) -> Ru
     in_msgs = convert_to_lc_messages([m.model_dump() for m in body.input.messages])
     cfg = build_run_config(thread_id, body)
 
-    await graph.ainvoke({"messages": in_msgs}, config=cfg)
-
-    tup = await checkpointer.aget_tuple({"configurable": {"thread_id": thread_id}})
-    msgs: List[BaseMessage] = []
-    if tup and tup.checkpoint:
-        msgs = tup.checkpoint.get("channel_values", {}).get("messages", []) or []
+    state = await graph.ainvoke({"messages": in_msgs}, config=cfg)
+    msgs = await final_messages(checkpointer, thread_id, state)
 
     return RunResponse(result=RunResult(messages=lc_messages_to_list(msgs)))
 
@@ -170,18 +249,20 @@ async def run_and_stream(request: Request, thread_id: str, body: RunRequest):
 
     async def event_iterator():
         try:
+            final_state: Any = None
             async for event in graph.astream_events({"messages": in_msgs}, config=cfg):
-                if event.get("event") == "on_chat_model_stream":
+                kind = event.get("event")
+                if kind == "on_chat_model_stream":
                     chunk = event.get("data", {}).get("chunk")
                     text = chunk_to_text(chunk) if chunk is not None else ""
                     if not text:
                         continue
                     yield sse_payload({"event": "chunk", "thread_id": thread_id, "text": text})
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    # fim do run raiz: saída = estado final do grafo
+                    final_state = event.get("data", {}).get("output")
 
-            tup = await checkpointer.aget_tuple({"configurable": {"thread_id": thread_id}})
-            msgs: List[BaseMessage] = []
-            if tup and tup.checkpoint:
-                msgs = tup.checkpoint.get("channel_values", {}).get("messages", []) or []
+            msgs = await final_messages(checkpointer, thread_id, final_state)
 
             yield sse_payload(
                 {"event": "final", "thread_id": thread_id, "messages": lc_messages_to_list(msgs)}
@@ -1,33 +1,46 @@
 from __future__ import annotations
 
+from collections import Counter
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException
-
-from app.db.threads import list_threads_by_user_id, update_thread_user_id
-from app.db.user_profiles import (
-    create_user_profile as db_create_user_profile,
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from app.db.user_profiles import UserProfileRecord, lookup_user_profiles
+from app.models.schemas import (
+    ThreadObj,
+    UserProfileCreate,
+    UserProfileImportResponse,
+    UserProfileImportResult,
+    UserProfileLookupRequest,
+    UserProfileLookupResult,
+    UserProfileObj,
+    UserProfileThreadUpdate,
+)
+from app.services.user_profile_cache import (
     get_user_profile_by_customer_profile,
     get_user_profile_by_id,
     get_user_profile_by_stack_user_id,
-    update_user_profile,
+    import_user_profiles as cached_import_user_profiles,
+    link_thread_to_user_profile,
+    list_user_profile_threads as list_user_profile_threads_page,
+    upsert_user_profile,
 )
-from app.models.schemas import ThreadObj, UserProfileCreate, UserProfileObj, UserProfileThreadUpdate
+from app.services.user_profile_import import ImportTooLargeError, import_format, parse_import_stream
+from app.utils.cursor import parse_cursor_or_400, set_next_cursor
 
 
 router = APIRouter(tags=["user_profiles"])
 
 
-def _row_to_obj(row) -> UserProfileObj:
-    user_id, stack_user_id, customer_profile, name, phone, created_at, updated_at = row
+def _row_to_obj(row: UserProfileRecord) -> UserProfileObj:
     return UserProfileObj(
-        id=user_id,
-        stack_user_id=stack_user_id,
-        customer_profile=customer_profile,
-        name=name,
-        phone=phone,
-        created_at=created_at,
-        updated_at=updated_at,
+        id=row.id,
+        stack_user_id=row.stack_user_id,
+        customer_profile=row.customer_profile,
+        name=row.name,
+        phone=row.phone,
+        created_at=row.created_at,
+        updated_at=row.updated_at,
     )
 
 
@@ -36,38 +49,65 @@ async def create_user_profile(body: UserProfileCreate) -> UserProfileObj:
     if body.stack_user_id is None and body.customer_profile is None:
         raise HTTPException(status_code=400, detail="stack_user_id ou customer_profile é obrigatório")
 
-    by_stack = None
-    by_customer = None
-    if body.stack_user_id is not None:
-        by_stack = await get_user_profile_by_stack_user_id(body.stack_user_id)
-    if body.customer_profile is not None:
-        by_customer = await get_user_profile_by_customer_profile(body.customer_profile)
-
-    if by_stack and by_customer and by_stack[0] != by_customer[0]:
-        raise HTTPException(status_code=409, detail="stack_user_id e customer_profile pertencem a usuários diferentes")
-
-    existing = by_stack or by_customer
-    if existing:
-        updated = await update_user_profile(
-            user_id=UUID(existing[0]),
-            stack_user_id=body.stack_user_id,
-            customer_profile=body.customer_profile,
-            name=body.name,
-            phone=body.phone,
-        )
-        if not updated:
-            raise HTTPException(status_code=500, detail="Failed to update user profile")
-        return _row_to_obj(updated)
-
-    row = await db_create_user_profile(
+    outcome, row = await upsert_user_profile(
         stack_user_id=body.stack_user_id,
         customer_profile=body.customer_profile,
         name=body.name,
         phone=body.phone,
     )
+    if outcome == "conflict":
+        raise HTTPException(status_code=409, detail="stack_user_id e customer_profile pertencem a usuários diferentes")
     return _row_to_obj(row)
 
 
+@router.post("/user-profiles/import", response_model=UserProfileImportResponse)
+async def import_user_profiles(request: Request) -> UserProfileImportResponse:
+    """
+    Import em lote (CRM sync). Corpo em NDJSON (um objeto por linha) ou CSV
+    com cabeçalho, conforme o Content-Type; mesmos campos de POST /user-profiles.
+    As linhas são aplicadas numa única transação e o resultado vem por linha.
+    """
+    fmt = import_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Content-Type deve ser application/x-ndjson ou text/csv")
+
+    invalid: list[tuple[int, str]] = []
+    try:
+        merged = await cached_import_user_profiles(parse_import_stream(request.stream(), fmt, invalid))
+    except ImportTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    results = [UserProfileImportResult(index=r.idx, outcome=r.outcome, id=r.id) for r in merged]
+    results += [UserProfileImportResult(index=idx, outcome="invalid", error=error) for idx, error in invalid]
+    results.sort(key=lambda r: r.index)
+    return UserProfileImportResponse(
+        total=len(results),
+        counts=dict(Counter(r.outcome for r in results)),
+        results=results,
+    )
+
+
+@router.post("/user-profiles/lookup", response_model=list[UserProfileLookupResult])
+async def lookup_user_profiles_batch(body: UserProfileLookupRequest) -> list[UserProfileLookupResult]:
+    """Versão em lote de GET /user-profiles/by-provider-id (uma query para todas as chaves)."""
+    valid = [
+        (i, k) for i, k in enumerate(body.keys)
+        if k.stack_user_id is not None or k.customer_profile is not None
+    ]
+    found = await lookup_user_profiles([(k.stack_user_id, k.customer_profile) for _, k in valid])
+
+    results = [UserProfileLookupResult(index=i, outcome="invalid") for i in range(len(body.keys))]
+    for (i, _), (by_stack, by_customer, row) in zip(valid, found):
+        if by_stack and by_customer and by_stack != by_customer:
+            results[i].outcome = "conflict"
+        elif row is None:
+            results[i].outcome = "not_found"
+        else:
+            results[i].outcome = "found"
+            results[i].profile = _row_to_obj(row)
+    return results
+
+
 @router.get("/user-profiles/by-provider-id", response_model=UserProfileObj)
 async def read_user_profile_by_provider_id(
     stack_user_id: UUID | None = None,
@@ -83,7 +123,7 @@ async def read_user_profile_by_provider_id(
     if customer_profile is not None:
         by_customer = await get_user_profile_by_customer_profile(customer_profile)
 
-    if by_stack and by_customer and by_stack[0] != by_customer[0]:
+    if by_stack and by_customer and by_stack.id != by_customer.id:
         raise HTTPException(status_code=409, detail="stack_user_id e customer_profile pertencem a usuários diferentes")
 
     row = by_stack or by_customer
@@ -106,11 +146,9 @@ async def update_user_profile_thread(
     user_id: UUID,
     body: UserProfileThreadUpdate,
 ) -> UserProfileObj:
-    row = await get_user_profile_by_id(user_id)
+    row, updated = await link_thread_to_user_profile(user_id, body.thread_id)
     if not row:
         raise HTTPException(status_code=404, detail="User profile not found")
-
-    updated = await update_thread_user_id(body.thread_id, user_id)
     if not updated:
         raise HTTPException(status_code=404, detail="Thread not found")
 
@@ -120,11 +158,15 @@ async def update_user_profile_thread(
 @router.get("/user-profiles/{user_id}/threads")
 async def list_user_profile_threads(
     user_id: UUID,
+    response: Response,
     limit: int = 50,
+    cursor: str | None = None,
 ) -> list[ThreadObj]:
-    row = await get_user_profile_by_id(user_id)
-    if not row:
+    after = parse_cursor_or_400(cursor)
+    page = await list_user_profile_threads_page(user_id, limit=limit, after=after)
+    if page is None:
         raise HTTPException(status_code=404, detail="User profile not found")
 
-    rows = await list_threads_by_user_id(user_id, limit=limit)
-    return [ThreadObj(thread_id=t, created_at=ts, values={"messages": []}) for t, ts in rows]
+    rows, next_key = page
+    set_next_cursor(response, next_key)
+    return [ThreadObj(thread_id=t.thread_id, created_at=t.created_at, values={"messages": []}) for t in rows]
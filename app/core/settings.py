@@ -38,6 +38,22 @@ class Settings(BaseSettings):
     database_url: str = Field(..., alias="DATABASE_URL")
     db_pool_min_size: int = Field(default=1, alias="DB_POOL_MIN_SIZE")
     db_pool_max_size: int = Field(default=10, alias="DB_POOL_MAX_SIZE")
+    db_prepared_statements: bool = Field(default=True, alias="DB_PREPARED_STATEMENTS")
+    run_migrations_on_startup: bool = Field(default=True, alias="RUN_MIGRATIONS_ON_STARTUP")
+    migrations_lock_timeout_seconds: float = Field(default=300, alias="MIGRATIONS_LOCK_TIMEOUT_SECONDS")
+    checkpointer_pool_min_size: int = Field(default=1, alias="CHECKPOINTER_POOL_MIN_SIZE")
+    checkpointer_pool_max_size: int = Field(default=10, alias="CHECKPOINTER_POOL_MAX_SIZE")
+    checkpointer_statement_timeout_ms: int = Field(default=30000, alias="CHECKPOINTER_STATEMENT_TIMEOUT_MS")
+    checkpoint_compression_enabled: bool = Field(default=True, alias="CHECKPOINT_COMPRESSION_ENABLED")
+    checkpoint_zstd_level: int = Field(default=3, alias="CHECKPOINT_ZSTD_LEVEL")
+    checkpoint_zstd_min_size: int = Field(default=64, alias="CHECKPOINT_ZSTD_MIN_SIZE")
+    checkpoint_zstd_dict_path: str = Field(default="", alias="CHECKPOINT_ZSTD_DICT_PATH")
+    checkpoint_compaction_enabled: bool = Field(default=False, alias="CHECKPOINT_COMPACTION_ENABLED")
+    checkpoint_keep_latest: int = Field(default=5, alias="CHECKPOINT_KEEP_LATEST")
+    checkpoint_compaction_interval_seconds: float = Field(default=3600, alias="CHECKPOINT_COMPACTION_INTERVAL_SECONDS")
+    checkpoint_compaction_batch_size: int = Field(default=100, alias="CHECKPOINT_COMPACTION_BATCH_SIZE")
+    checkpoint_compaction_max_rows: int = Field(default=5000, alias="CHECKPOINT_COMPACTION_MAX_ROWS")
+    checkpoint_compaction_min_idle_seconds: float = Field(default=600, alias="CHECKPOINT_COMPACTION_MIN_IDLE_SECONDS")
 
     # Agent / LLM
     debug_agent_logs: bool = Field(default=False, alias="DEBUG_AGENT_LOGS")
@@ -56,6 +72,21 @@ class Settings(BaseSettings):
 
     openrouter_max_tokens: int = Field(default=2048, alias="OPENROUTER_MAX_TOKENS")
 
+    # Trinks / caches
+    eligibility_refresh_enabled: bool = Field(default=True, alias="ELIGIBILITY_REFRESH_ENABLED")
+    eligibility_ttl_seconds: float = Field(default=900, alias="ELIGIBILITY_TTL_SECONDS")
+    eligibility_refresh_interval_seconds: float = Field(default=300, alias="ELIGIBILITY_REFRESH_INTERVAL_SECONDS")
+    eligibility_refresh_concurrency: int = Field(default=8, alias="ELIGIBILITY_REFRESH_CONCURRENCY")
+    service_catalog_ttl_seconds: float = Field(default=600, alias="SERVICE_CATALOG_TTL_SECONDS")
+    agenda_cache_ttl_seconds: float = Field(default=30, alias="AGENDA_CACHE_TTL_SECONDS")
+    agenda_cache_max_days: int = Field(default=62, alias="AGENDA_CACHE_MAX_DAYS")
+    catalog_cache_enabled: bool = Field(default=True, alias="CATALOG_CACHE_ENABLED")
+    catalog_cache_ttl_seconds: float = Field(default=600, alias="CATALOG_CACHE_TTL_SECONDS")
+    catalog_cache_l1_ttl_seconds: float = Field(default=60, alias="CATALOG_CACHE_L1_TTL_SECONDS")
+    user_profile_cache_enabled: bool = Field(default=True, alias="USER_PROFILE_CACHE_ENABLED")
+    user_profile_cache_ttl_seconds: float = Field(default=30, alias="USER_PROFILE_CACHE_TTL_SECONDS")
+    user_profile_cache_max_entries: int = Field(default=10_000, alias="USER_PROFILE_CACHE_MAX_ENTRIES")
+
     @property
     def allow_origins(self) -> List[str]:
         raw = (self.allow_origins_raw or "").strip()
@@ -1,11 +1,12 @@
 from app.db.pool import init_pool, open_pool, close_pool
-from app.db.threads import insert_thread, get_thread_created_at, list_threads
+from app.db.threads import insert_thread, insert_threads, get_thread_created_at, list_threads
 
 __all__ = [
     "init_pool",
     "open_pool",
     "close_pool",
     "insert_thread",
+    "insert_threads",
     "get_thread_created_at",
     "list_threads",
 ]
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import Any, Optional, Tuple
+
+from psycopg.types.json import Jsonb
+
+from app.db.pool import get_pool
+
+
+async def get_cache_entry(
+    cache_key: str,
+    known_version: Optional[int] = None,
+) -> Optional[Tuple[int, bool, Any]]:
+    """
+    Retorna (version, fresh, payload) ou None se a chave não existe / nunca foi gravada.
+
+    Se known_version for igual à versão gravada, o payload volta como None
+    (quem chamou já tem esse conteúdo; evita trafegar o jsonb de novo).
+    """
+    pool = get_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                select version,
+                       expires_at > now() as fresh,
+                       case when version = %s then null else payload end
+                  from catalog_cache
+                 where cache_key = %s
+                   and version > 0
+                """,
+                (known_version, cache_key),
+            )
+            row = await cur.fetchone()
+            return (row[0], row[1], row[2]) if row else None
+
+
+async def try_claim_refresh(cache_key: str, lease_seconds: float) -> bool:
+    """
+    Tenta reservar o refresh da chave por lease_seconds.
+
+    Só uma réplica consegue: a reserva falha se a entrada ainda está válida
+    ou se outra réplica tem um lease em andamento.
+    """
+    pool = get_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                insert into catalog_cache (cache_key, refreshing_until)
+                values (%s, now() + make_interval(secs => %s))
+                on conflict (cache_key) do update
+                   set refreshing_until = excluded.refreshing_until
+                 where catalog_cache.expires_at <= now()
+                   and (catalog_cache.refreshing_until is null or catalog_cache.refreshing_until < now())
+                returning cache_key
+                """,
+                (cache_key, lease_seconds),
+            )
+            claimed = await cur.fetchone() is not None
+            await conn.commit()
+            return claimed
+
+
+async def put_cache_entry(cache_key: str, payload: Any, ttl_seconds: float) -> int:
+    """Grava o payload, incrementa a versão e libera o lease. Retorna a nova versão."""
+    pool = get_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                insert into catalog_cache (cache_key, version, payload, expires_at, refreshing_until, updated_at)
+                values (%s, 1, %s, now() + make_interval(secs => %s), null, now())
+                on conflict (cache_key) do update
+                   set version = catalog_cache.version + 1,
+                       payload = excluded.payload,
+                       expires_at = excluded.expires_at,
+                       refreshing_until = null,
+                       updated_at = now()
+                returning version
+                """,
+                (cache_key, Jsonb(payload), ttl_seconds),
+            )
+            row = await cur.fetchone()
+            await conn.commit()
+            return row[0]
+
+
+async def release_refresh(cache_key: str) -> None:
+    """Libera o lease sem gravar (refresh falhou)."""
+    pool = get_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "update catalog_cache set refreshing_until = null where cache_key = %s",
+                (cache_key,),
+            )
+            await conn.commit()
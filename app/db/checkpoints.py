@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+from typing import List, Optional, Sequence, Tuple
+
+from app.db.pool import get_pool
+
+
+async def get_latest_channel_blob(
+    thread_id: str,
+    channel: str,
+    checkpoint_ns: str = "",
+) -> Optional[Tuple[str, bytes]]:
+    """
+    Lê só o blob de um canal (ex: "messages") no checkpoint mais recente do thread,
+    sem carregar os demais canais nem os pending writes.
+
+    Retorna (type, blob) para serde.loads_typed, ou None se não houver checkpoint
+    ou se o checkpoint mais recente não tiver blob nessa versão do canal (quem
+    chama cai para a leitura completa; nunca devolve o blob de um checkpoint antigo).
+    """
+    pool = get_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                with latest as (
+                    select c.thread_id,
+                           c.checkpoint_ns,
+                           c.checkpoint -> 'channel_versions' ->> %s as version
+                      from checkpoints c
+                     where c.thread_id = %s
+                       and c.checkpoint_ns = %s
+                     order by c.checkpoint_id desc
+                     limit 1
+                )
+                select bl.type, bl.blob
+                  from latest l
+                  left join checkpoint_blobs bl
+                    on bl.thread_id = l.thread_id
+                   and bl.checkpoint_ns = l.checkpoint_ns
+                   and bl.channel = %s
+                   and bl.version = l.version
+                """,
+                (channel, thread_id, checkpoint_ns, channel),
+            )
+            row = await cur.fetchone()
+            if not row or row[0] is None:
+                return None
+            return row[0], row[1]
+
+
+# -----------------------------
+# Compactação
+# -----------------------------
+# Um único compactador por vez entre réplicas (lock de transação, por lote)
+_COMPACTION_LOCK_KEY = "svim:checkpoint_compaction"
+
+
+async def list_idle_threads(after_thread_id: str, idle_seconds: float, limit: int) -> List[str]:
+    """
+    Próximo lote de threads (ordem de thread_id, depois de after_thread_id) cujo
+    checkpoint mais recente é mais antigo que idle_seconds. Threads com run em
+    andamento ficam de fora, então blobs recém-gravados nunca são tratados como órfãos.
+    """
+    pool = get_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                select thread_id
+                  from checkpoints
+                 where thread_id > %s
+                 group by thread_id
+                having max((checkpoint ->> 'ts')::timestamptz) < now() - make_interval(secs => %s)
+                 order by thread_id
+                 limit %s
+                """,
+                (after_thread_id, idle_seconds, limit),
+            )
+            rows = await cur.fetchall()
+            return [r[0] for r in rows]
+
+
+async def compact_threads(
+    thread_ids: Sequence[str],
+    keep_latest: int,
+    max_rows: int,
+) -> Optional[Tuple[int, int, int]]:
+    """
+    Uma rodada de compactação, em uma transação: mantém os keep_latest
+    checkpoints mais recentes de cada (thread, namespace) e apaga os demais,
+    os writes sem checkpoint e os blobs que nenhum checkpoint restante
+    referencia — no máximo max_rows linhas por tabela (delete por ctid com
+    limit), para a transação e o lock ficarem curtos mesmo em threads enormes.
+
+    Retorna (checkpoints, writes, blobs) apagados; se algum chegou a max_rows,
+    ainda pode haver o que apagar e quem chama roda outra rodada. None se outra
+    réplica está compactando.
+    """
+    threads = list(thread_ids)
+    pool = get_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("select pg_try_advisory_xact_lock(hashtext(%s))", (_COMPACTION_LOCK_KEY,))
+            row = await cur.fetchone()
+            if not row or not row[0]:
+                await conn.rollback()
+                return None
+
+            await cur.execute(
+                """
+                delete from checkpoints
+                 where ctid in (
+                     select ctid
+                       from (
+                           select ctid,
+                                  row_number() over (
+                                      partition by thread_id, checkpoint_ns
+                                      order by checkpoint_id desc
+                                  ) as rn
+                             from checkpoints
+                            where thread_id = any(%s)
+                       ) ranked
+                      where rn > %s
+                      limit %s
+                 )
+                """,
+                (threads, keep_latest, max_rows),
+            )
+            checkpoints = cur.rowcount or 0
+
+            await cur.execute(
+                """
+                delete from checkpoint_writes
+                 where ctid in (
+                     select w.ctid
+                       from checkpoint_writes w
+                      where w.thread_id = any(%s)
+                        and not exists (
+                            select 1
+                              from checkpoints c
+                             where c.thread_id = w.thread_id
+                               and c.checkpoint_ns = w.checkpoint_ns
+                               and c.checkpoint_id = w.checkpoint_id
+                        )
+                      limit %s
+                 )
+                """,
+                (threads, max_rows),
+            )
+            writes = cur.rowcount or 0
+
+            await cur.execute(
+                """
+                delete from checkpoint_blobs
+                 where ctid in (
+                     select bl.ctid
+                       from checkpoint_blobs bl
+                      where bl.thread_id = any(%s)
+                        and not exists (
+                            select 1
+                              from checkpoints c
+                             where c.thread_id = bl.thread_id
+                               and c.checkpoint_ns = bl.checkpoint_ns
+                               and c.checkpoint -> 'channel_versions' ->> bl.channel = bl.version
+                        )
+                      limit %s
+                 )
+                """,
+                (threads, max_rows),
+            )
+            blobs = cur.rowcount or 0
+
+            await conn.commit()
+            return checkpoints, writes, blobs
+
+
+async def count_compactable(thread_ids: Sequence[str], keep_latest: int) -> Tuple[int, int, int]:
+    """
+    Dry-run de compact_threads: (checkpoints, writes, blobs) que seriam apagados,
+    com os mesmos critérios, só com select count(*) (sem locks de linha nem
+    tuplas mortas).
+    """
+    pool = get_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                with ranked as (
+                    select thread_id, checkpoint_ns, checkpoint_id, checkpoint,
+                           row_number() over (
+                               partition by thread_id, checkpoint_ns
+                               order by checkpoint_id desc
+                           ) as rn
+                      from checkpoints
+                     where thread_id = any(%(threads)s)
+                ),
+                kept as (
+                    select * from ranked where rn <= %(keep)s
+                )
+                select
+                    (select count(*) from ranked where rn > %(keep)s),
+                    (select count(*)
+                       from checkpoint_writes w
+                      where w.thread_id = any(%(threads)s)
+                        and not exists (
+                            select 1
+                              from kept k
+                             where k.thread_id = w.thread_id
+                               and k.checkpoint_ns = w.checkpoint_ns
+                               and k.checkpoint_id = w.checkpoint_id
+                        )),
+                    (select count(*)
+                       from checkpoint_blobs bl
+                      where bl.thread_id = any(%(threads)s)
+                        and not exists (
+                            select 1
+                              from kept k
+                             where k.thread_id = bl.thread_id
+                               and k.checkpoint_ns = bl.checkpoint_ns
+                               and k.checkpoint -> 'channel_versions' ->> bl.channel = bl.version
+                        ))
+                """,
+                {"threads": list(thread_ids), "keep": keep_latest},
+            )
+            row = await cur.fetchone()
+            return row[0], row[1], row[2]
@@ -0,0 +1,8 @@
+create table if not exists catalog_cache (
+    cache_key text primary key,
+    version bigint not null default 0,
+    payload jsonb,
+    expires_at timestamptz not null default '-infinity',
+    refreshing_until timestamptz,
+    updated_at timestamptz not null default now()
+);
@@ -0,0 +1,5 @@
+create index if not exists threads_created_at_thread_id_idx
+    on threads (created_at desc, thread_id desc);
+
+create index if not exists threads_user_id_created_at_idx
+    on threads (user_id, created_at desc, thread_id desc);
@@ -1,34 +1,71 @@
+"""
+Migrations SQL versionadas (app/db/migrations/*.sql).
+
+Uso (CLI, ex: etapa de release, com RUN_MIGRATIONS_ON_STARTUP=false nas réplicas):
+    python -m app.db.migrator [--database-url postgresql://...] [--status]
+"""
 from __future__ import annotations
 
+import argparse
+import asyncio
+import hashlib
+import logging
+import re
+import time
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from psycopg import AsyncConnection
+from psycopg import errors as pg_errors
+from psycopg import sql as pg_sql
 
 from app.db.pool import get_pool
 
+logger = logging.getLogger(__name__)
 
 MIGRATIONS_DIR = Path(__file__).parent / "migrations"
 
+# Uma réplica migrando por vez (lock de sessão)
+_MIGRATIONS_LOCK_KEY = "svim:schema_migrations"
+_LOCK_POLL_SECONDS = 0.5
+
+# Marcador (nos comentários do topo do arquivo) para rodar fora de transação
+NO_TRANSACTION_MARKER = "migrate:no-transaction"
+
+_DOLLAR_TAG_RE = re.compile(r"\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$")
+_CONCURRENT_INDEX_RE = re.compile(
+    r"\bcreate\s+(?:unique\s+)?index\s+concurrently\s+(?:if\s+not\s+exists\s+)?"
+    r"((?:\"[^\"]+\"|[A-Za-z_][\w$]*)(?:\s*\.\s*(?:\"[^\"]+\"|[A-Za-z_][\w$]*))?)",
+    re.IGNORECASE,
+)
+
 
 async def _ensure_schema_migrations_table(conn: AsyncConnection) -> None:
-    async with conn.cursor() as cur:
-        await cur.execute(
-            """
-            create table if not exists schema_migrations (
-                version text primary key,
-                applied_at timestamptz not null default now()
-            );
-            """
-        )
-        await conn.commit()
+    async with conn.transaction():
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                create table if not exists schema_migrations (
+                    version text primary key,
+                    applied_at timestamptz not null default now()
+                );
+                alter table schema_migrations add column if not exists checksum text;
+
+                -- checksum do conjunto de migrations já aplicado (fast path do boot)
+                create table if not exists schema_migrations_state (
+                    id int primary key default 1 check (id = 1),
+                    checksum text not null,
+                    updated_at timestamptz not null default now()
+                );
+                """
+            )
 
 
-async def _get_applied_versions(conn: AsyncConnection) -> set[str]:
+async def _get_applied_versions(conn: AsyncConnection) -> Dict[str, Optional[str]]:
     async with conn.cursor() as cur:
-        await cur.execute("select version from schema_migrations;")
+        await cur.execute("select version, checksum from schema_migrations;")
         rows = await cur.fetchall()
-        return {r[0] for r in rows}
+        return {r[0]: r[1] for r in rows}
 
 
 def _list_migration_files() -> List[Path]:
@@ -38,50 +75,346 @@ def _list_migration_files() -> List[Path]:
     return files
 
 
-async def run_migrations() -> None:
+def migration_checksums(files: List[Path]) -> Tuple[str, Dict[str, str]]:
+    """(checksum do conjunto, checksum por arquivo). Muda se qualquer arquivo mudar/entrar/sair."""
+    per_file = {p.name: hashlib.sha256(p.read_bytes()).hexdigest() for p in files}
+    h = hashlib.sha256()
+    for name in sorted(per_file):
+        h.update(f"{name}:{per_file[name]}\n".encode())
+    return h.hexdigest(), per_file
+
+
+async def _stored_set_checksum(conn: AsyncConnection) -> Optional[str]:
+    try:
+        async with conn.cursor() as cur:
+            await cur.execute("select checksum from schema_migrations_state where id = 1;")
+            row = await cur.fetchone()
+            return row[0] if row else None
+    except pg_errors.UndefinedTable:
+        # banco novo: ainda não há registro
+        return None
+
+
+async def _acquire_lock(conn: AsyncConnection, timeout_seconds: float) -> None:
+    deadline = time.monotonic() + timeout_seconds
+    waiting = False
+    while True:
+        async with conn.cursor() as cur:
+            await cur.execute("select pg_try_advisory_lock(hashtext(%s));", (_MIGRATIONS_LOCK_KEY,))
+            row = await cur.fetchone()
+        if row and row[0]:
+            return
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Lock de migrations não obtido em {timeout_seconds:.0f}s")
+        if not waiting:
+            logger.info("[migrations] outra réplica está migrando; aguardando")
+            waiting = True
+        await asyncio.sleep(_LOCK_POLL_SECONDS)
+
+
+async def _release_lock(conn: AsyncConnection) -> None:
+    async with conn.cursor() as cur:
+        await cur.execute("select pg_advisory_unlock(hashtext(%s));", (_MIGRATIONS_LOCK_KEY,))
+
+
+async def _apply(conn: AsyncConnection, version: str, sql: str, checksum: str) -> None:
+    # Uma transação por migration (a migration e o registro entram juntos)
+    async with conn.transaction():
+        async with conn.cursor() as cur:
+            if sql:
+                await cur.execute(sql)
+            await cur.execute(
+                "insert into schema_migrations (version, checksum) values (%s, %s);",
+                (version, checksum),
+            )
+
+
+def is_no_transaction(sql: str) -> bool:
+    """True se os comentários iniciais do arquivo têm `-- migrate:no-transaction`."""
+    for line in sql.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith("--"):
+            return False
+        if line[2:].strip().lower() == NO_TRANSACTION_MARKER:
+            return True
+    return False
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Separa o SQL em statements no `;` de nível superior, respeitando strings
+    ('...', E'...', "..."), dollar quotes ($$...$$, $tag$...$tag$) e
+    comentários (-- e /* */ aninhados). Trechos só com comentários são descartados.
+    """
+    out: List[str] = []
+    n = len(sql)
+    start = 0
+    i = 0
+    has_code = False
+    while i < n:
+        ch = sql[i]
+        if sql.startswith("--", i):
+            j = sql.find("\n", i)
+            i = n if j < 0 else j + 1
+            continue
+        if sql.startswith("/*", i):
+            depth, i = 1, i + 2
+            while i < n and depth:
+                if sql.startswith("/*", i):
+                    depth, i = depth + 1, i + 2
+                elif sql.startswith("*/", i):
+                    depth, i = depth - 1, i + 2
+                else:
+                    i += 1
+            continue
+        if ch in ("'", '"'):
+            escapes = ch == "'" and i > 0 and sql[i - 1] in "eE"
+            j = i + 1
+            while j < n:
+                if escapes and sql[j] == "\\":
+                    j += 2
+                    continue
+                if sql[j] == ch:
+                    if j + 1 < n and sql[j + 1] == ch:
+                        j += 2
+                        continue
+                    break
+                j += 1
+            i, has_code = j + 1, True
+            continue
+        if ch == "$":
+            m = _DOLLAR_TAG_RE.match(sql, i)
+            if m:
+                end = sql.find(m.group(0), m.end())
+                i, has_code = (n if end < 0 else end + len(m.group(0))), True
+                continue
+        if ch == ";":
+            if has_code:
+                out.append(sql[start:i].strip())
+            start, has_code = i + 1, False
+        elif not ch.isspace():
+            has_code = True
+        i += 1
+    if has_code:
+        out.append(sql[start:].strip())
+    return out
+
+
+def _concurrent_index_names(statements: List[str]) -> List[str]:
+    """Nomes (sem schema) dos índices criados com CREATE INDEX CONCURRENTLY."""
+    names = []
+    for stmt in statements:
+        m = _CONCURRENT_INDEX_RE.search(stmt)
+        if m:
+            last = re.split(r"\s*\.\s*", m.group(1))[-1]
+            names.append(last[1:-1] if last.startswith('"') else last.lower())
+    return names
+
+
+async def _invalid_indexes(conn: AsyncConnection, names: List[str]) -> List[Tuple[str, str]]:
+    """(schema, nome) dos índices com indisvalid = false entre `names`."""
+    if not names:
+        return []
+    async with conn.cursor() as cur:
+        await cur.execute(
+            """
+            select n.nspname, c.relname
+              from pg_index i
+              join pg_class c on c.oid = i.indexrelid
+              join pg_namespace n on n.oid = c.relnamespace
+             where not i.indisvalid
+               and c.relname = any(%s)
+               and n.nspname = any(current_schemas(false))
+            """,
+            (names,),
+        )
+        return [(r[0], r[1]) for r in await cur.fetchall()]
+
+
+async def _apply_no_transaction(conn: AsyncConnection, version: str, sql: str, checksum: str) -> None:
+    """
+    Roda a migration fora de transação, um statement por vez (autocommit),
+    para CREATE/DROP INDEX CONCURRENTLY. Os statements devem ser idempotentes
+    (if not exists / if exists): se algo falhar no meio, a migration não é
+    registrada e roda inteira de novo no próximo run.
+
+    Um CREATE INDEX CONCURRENTLY interrompido deixa o índice inválido, e o
+    `if not exists` o pularia para sempre; por isso os índices inválidos
+    citados no arquivo são removidos antes de rodar.
+    """
+    statements = split_statements(sql)
+    index_names = _concurrent_index_names(statements)
+
+    async with conn.cursor() as cur:
+        for schema, name in await _invalid_indexes(conn, index_names):
+            logger.warning(
+                "[migrations] %s: índice inválido %s.%s (build anterior falhou); recriando",
+                version, schema, name,
+            )
+            await cur.execute(
+                pg_sql.SQL("drop index concurrently if exists {};").format(pg_sql.Identifier(schema, name))
+            )
+
+        for stmt in statements:
+            await cur.execute(stmt)
+
+    invalid = await _invalid_indexes(conn, index_names)
+    if invalid:
+        raise RuntimeError(f"{version}: índices inválidos após a migration: {invalid}")
+
+    async with conn.cursor() as cur:
+        await cur.execute(
+            "insert into schema_migrations (version, checksum) values (%s, %s);",
+            (version, checksum),
+        )
+
+
+async def _store_set_checksum(conn: AsyncConnection, checksum: str) -> None:
+    async with conn.transaction():
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                insert into schema_migrations_state (id, checksum) values (1, %s)
+                on conflict (id) do update set checksum = excluded.checksum, updated_at = now();
+                """,
+                (checksum,),
+            )
+
+
+async def run_migrations(lock_timeout_seconds: float = 300) -> List[str]:
     """
     Executa migrations SQL versionadas em app/db/migrations/*.sql.
 
     - Cada arquivo .sql é identificado pelo nome (ex: "0001_create_threads.sql").
     - Só roda migrations ainda não aplicadas (registradas em schema_migrations).
-    - Executa em transação por migration.
-    """
-    pool = get_pool()
+    - Executa em transação por migration, exceto arquivos marcados com
+      `-- migrate:no-transaction` (ver _apply_no_transaction).
+    - Fast path: se o checksum do conjunto de arquivos bate com o gravado no
+      último run, não faz mais nada (uma query).
+    - Entre réplicas, um advisory lock serializa o run; quem esperou revalida
+      o checksum e normalmente sai pelo fast path.
 
+    Retorna as versões aplicadas neste run.
+    """
     files = _list_migration_files()
     if not files:
-        return
+        return []
 
+    set_checksum, file_checksums = migration_checksums(files)
+    pool = get_pool()
     async with pool.connection() as conn:  # type: AsyncConnection
-        await _ensure_schema_migrations_table(conn)
+        previous_autocommit = conn.autocommit
+        await conn.set_autocommit(True)
+        try:
+            if await _stored_set_checksum(conn) == set_checksum:
+                logger.debug("[migrations] nada a fazer (checksum %s)", set_checksum[:12])
+                return []
+
+            await _acquire_lock(conn, lock_timeout_seconds)
+            try:
+                if await _stored_set_checksum(conn) == set_checksum:
+                    return []
+                return await _run_pending(conn, files, set_checksum, file_checksums)
+            finally:
+                await _release_lock(conn)
+        finally:
+            await conn.set_autocommit(previous_autocommit)
+
+
+async def _run_pending(
+    conn: AsyncConnection,
+    files: List[Path],
+    set_checksum: str,
+    file_checksums: Dict[str, str],
+) -> List[str]:
+    await _ensure_schema_migrations_table(conn)
+    applied = await _get_applied_versions(conn)
+
+    done: List[str] = []
+    for path in files:
+        version = path.name
+        if version in applied:
+            recorded = applied[version]
+            if recorded and recorded != file_checksums[version]:
+                logger.warning("[migrations] %s foi alterada depois de aplicada (ignorada)", version)
+            continue
+
+        started = time.monotonic()
+        sql = path.read_text(encoding="utf-8").strip()
+        if is_no_transaction(sql):
+            await _apply_no_transaction(conn, version, sql, file_checksums[version])
+        else:
+            await _apply(conn, version, sql, file_checksums[version])
+        done.append(version)
+        logger.info("[migrations] %s aplicada em %.0f ms", version, (time.monotonic() - started) * 1000)
+
+    await _store_set_checksum(conn, set_checksum)
+    return done
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+async def _status(conn: AsyncConnection) -> None:
+    files = _list_migration_files()
+    set_checksum, file_checksums = migration_checksums(files)
+    stored = await _stored_set_checksum(conn)
+    try:
         applied = await _get_applied_versions(conn)
+    except pg_errors.UndefinedTable:
+        applied = {}
 
-        for path in files:
-            version = path.name
-            if version in applied:
-                continue
+    for path in files:
+        version = path.name
+        if version not in applied:
+            state = "pendente"
+        elif applied[version] and applied[version] != file_checksums[version]:
+            state = "aplicada (arquivo alterado)"
+        else:
+            state = "aplicada"
+        if is_no_transaction(path.read_text(encoding="utf-8")):
+            state += " [sem transação]"
+        print(f"{version:<48} {state}")
+    print(f"\nchecksum do conjunto: {set_checksum[:12]} (gravado: {(stored or '-')[:12]})")
+
+
+async def _cli(args: argparse.Namespace) -> None:
+    from app.db.pool import close_pool, init_pool, open_pool
+
+    database_url: Optional[str] = args.database_url
+    if not database_url:
+        from app.core.settings import get_settings
+
+        database_url = get_settings().database_url
+
+    init_pool(database_url, 1, 1)
+    await open_pool()
+    try:
+        if args.status:
+            async with get_pool().connection() as conn:
+                await conn.set_autocommit(True)
+                await _status(conn)
+            return
+        applied = await run_migrations(lock_timeout_seconds=args.lock_timeout)
+    finally:
+        await close_pool()
+
+    if applied:
+        print("aplicadas:\n" + "\n".join(f"  {v}" for v in applied))
+    else:
+        print("nada a aplicar")
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Aplica as migrations SQL pendentes.")
+    parser.add_argument("--database-url", type=str, default=None, help="default: DATABASE_URL do Settings")
+    parser.add_argument("--status", action="store_true", help="só lista o estado das migrations")
+    parser.add_argument("--lock-timeout", type=float, default=300, help="espera máxima pelo lock (segundos)")
+    asyncio.run(_cli(parser.parse_args()))
 
-            sql = path.read_text(encoding="utf-8").strip()
-            if not sql:
-                # Migration vazia: marca como aplicada e segue
-                async with conn.cursor() as cur:
-                    await cur.execute(
-                        "insert into schema_migrations (version) values (%s);",
-                        (version,),
-                    )
-                    await conn.commit()
-                continue
 
-            # Uma transação por migration
-            async with conn.cursor() as cur:
-                try:
-                    await cur.execute("begin;")
-                    await cur.execute(sql)
-                    await cur.execute(
-                        "insert into schema_migrations (version) values (%s);",
-                        (version,),
-                    )
-                    await cur.execute("commit;")
-                except Exception:
-                    await cur.execute("rollback;")
-                    raise
+if __name__ == "__main__":
+    main()
@@ -5,27 +5,43 @@ from typing import Optional
 from psycopg_pool import AsyncConnectionPool
 
 _pool: Optional[AsyncConnectionPool] = None
+_prepared_statements = True
 
 
-def init_pool(database_url: str, min_size: int = 1, max_size: int = 10) -> None:
+def init_pool(
+    database_url: str,
+    min_size: int = 1,
+    max_size: int = 10,
+    prepared_statements: bool = True,
+) -> None:
     """
     Cria o pool (open=False). A abertura real acontece em open_pool().
 
     - database_url vem do Settings (não lemos env aqui).
     - min_size/max_size também vêm do Settings.
+    - prepared_statements=False desliga os statements preparados da camada
+      app.db.query (necessário atrás de pgbouncer em modo transaction).
     """
-    global _pool
+    global _pool, _prepared_statements
     if _pool is not None:
         return
 
+    _prepared_statements = prepared_statements
+
     _pool = AsyncConnectionPool(
         conninfo=database_url,
         open=False,
         min_size=min_size,
         max_size=max_size,
+        # sem prepared statements, desliga também o prepare automático do psycopg
+        kwargs=None if prepared_statements else {"prepare_threshold": None},
     )
 
 
+def prepared_statements_enabled() -> bool:
+    return _prepared_statements
+
+
 def get_pool() -> AsyncConnectionPool:
     if _pool is None:
         raise RuntimeError("Database pool not initialized. Did you call init_pool()?")
@@ -0,0 +1,110 @@
+"""
+Camada fina sobre o pool para as queries da aplicação.
+
+- Statements preparados no servidor desde a primeira execução (prepare=True);
+  o psycopg guarda o plano por conexão, então cada SQL é parseado/planejado
+  uma vez por conexão do pool. Desligável em init_pool(prepared_statements=False).
+- pipeline(): vários statements em uma conexão e um único round trip.
+- Row factories: use psycopg.rows.class_row com as classes de linha (dataclasses
+  com slots) em vez de tuplas posicionais.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence
+
+from psycopg.rows import RowFactory, tuple_row
+
+from app.db.pool import get_pool, prepared_statements_enabled
+
+Params = Sequence[Any]
+
+
+@dataclass(slots=True)
+class Query:
+    sql: str
+    params: Params = ()
+    row_factory: RowFactory = tuple_row
+
+
+@dataclass(slots=True)
+class QueryResult:
+    rows: List[Any]
+    rowcount: int
+
+    def first(self) -> Optional[Any]:
+        return self.rows[0] if self.rows else None
+
+
+def _prepare() -> bool:
+    return prepared_statements_enabled()
+
+
+async def fetch_one(
+    sql: str,
+    params: Params = (),
+    *,
+    row_factory: RowFactory = tuple_row,
+    commit: bool = False,
+) -> Optional[Any]:
+    async with get_pool().connection() as conn:
+        async with conn.cursor(row_factory=row_factory) as cur:
+            await cur.execute(sql, params, prepare=_prepare())
+            row = await cur.fetchone()
+        if commit:
+            await conn.commit()
+        return row
+
+
+async def fetch_all(
+    sql: str,
+    params: Params = (),
+    *,
+    row_factory: RowFactory = tuple_row,
+    commit: bool = False,
+) -> List[Any]:
+    async with get_pool().connection() as conn:
+        async with conn.cursor(row_factory=row_factory) as cur:
+            await cur.execute(sql, params, prepare=_prepare())
+            rows = await cur.fetchall()
+        if commit:
+            await conn.commit()
+        return rows
+
+
+async def execute(sql: str, params: Params = (), *, commit: bool = True) -> int:
+    """Statement sem resultado; retorna o rowcount."""
+    async with get_pool().connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params, prepare=_prepare())
+            rowcount = cur.rowcount or 0
+        if commit:
+            await conn.commit()
+        return rowcount
+
+
+async def pipeline(queries: Sequence[Query], *, commit: bool = False) -> List[QueryResult]:
+    """
+    Executa as queries em ordem, na mesma transação, em pipeline mode: todas
+    vão para o servidor antes de esperar a primeira resposta (um round trip).
+
+    As queries não podem depender do resultado umas das outras no cliente;
+    dependências ficam no SQL (ex: `where exists (...)`). Se alguma falhar,
+    a transação inteira é desfeita e o erro sobe.
+    """
+    prepare = _prepare()
+    async with get_pool().connection() as conn:
+        cursors = []
+        async with conn.pipeline():
+            for q in queries:
+                cur = conn.cursor(row_factory=q.row_factory)
+                await cur.execute(q.sql, q.params, prepare=prepare)
+                cursors.append(cur)
+        results = []
+        for cur in cursors:
+            rows = await cur.fetchall() if cur.description is not None else []
+            results.append(QueryResult(rows=rows, rowcount=cur.rowcount or 0))
+            await cur.close()
+        if commit:
+            await conn.commit()
+        return results
@@ -1,96 +1,240 @@
 from __future__ import annotations
 
-from typing import Optional, List, Tuple
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, List, Sequence, Tuple
 from uuid import UUID
 
-from psycopg import AsyncConnection
+from psycopg.rows import class_row
 
-from app.db.pool import get_pool
+from app.db.query import Query, execute, fetch_all, fetch_one, pipeline
+from app.db.user_profiles import UserProfileRecord, profile_columns
 
 
-async def insert_thread(thread_id: str) -> None:
-    pool = get_pool()
-    async with pool.connection() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute(
-                """
-                insert into threads (thread_id)
-                values (%s)
-                on conflict (thread_id) do nothing
-                """,
-                (thread_id,),
-            )
-            await conn.commit()
+_CREATED_AT_SQL = """to_char(created_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"')"""
+
+
+@dataclass(slots=True)
+class ThreadRecord:
+    thread_id: str
+    created_at: str
+    # created_at sem formatação, para o cursor keyset
+    sort_key: datetime
+
+
+ThreadKey = Tuple[datetime, str]
+
+_thread_row = class_row(ThreadRecord)
+
+
+async def insert_thread(thread_id: str) -> Optional[str]:
+    """
+    Cria o thread (idempotente) e retorna o created_at em um único round trip.
+    Se o thread já existir, retorna o created_at original.
+    """
+    row = await fetch_one(
+        f"""
+        with ins as (
+            insert into threads (thread_id)
+            values (%s)
+            on conflict (thread_id) do nothing
+            returning created_at
+        )
+        select {_CREATED_AT_SQL} from ins
+        union all
+        select {_CREATED_AT_SQL} from threads
+         where thread_id = %s
+           and not exists (select 1 from ins)
+        """,
+        (thread_id, thread_id),
+        commit=True,
+    )
+    return row[0] if row else None
+
+
+@dataclass(slots=True)
+class ThreadBatchRecord:
+    idx: int
+    thread_id: str
+    # created | exists | duplicate | user_not_found
+    outcome: str
+    created_at: Optional[str]
+
+
+async def insert_threads(
+    thread_ids: Sequence[str],
+    user_ids: Optional[Sequence[Optional[UUID]]] = None,
+) -> List[ThreadBatchRecord]:
+    """
+    Cria vários threads em um único statement (unnest), opcionalmente já
+    vinculados a user_ids (mesma posição). Resultado por item, na ordem de entrada:
+
+    - created: thread criado;
+    - exists: thread_id já existia (nada muda; created_at original);
+    - duplicate: thread_id repetido no lote (vale o primeiro);
+    - user_not_found: user_id sem perfil (o thread não é criado).
+
+    Um perfil apagado entre a checagem e o insert ainda gera ForeignKeyViolation.
+    """
+    if not thread_ids:
+        return []
+    users = [str(u) if u is not None else None for u in (user_ids or [None] * len(thread_ids))]
+    return await fetch_all(
+        """
+        with input as (
+            select t.thread_id, t.user_id, t.ord::int - 1 as idx,
+                   row_number() over (partition by t.thread_id order by t.ord) as rn,
+                   (t.user_id is null
+                    or exists (select 1 from user_profiles p where p.id = t.user_id)) as user_ok
+              from unnest(%s::text[], %s::uuid[]) with ordinality as t(thread_id, user_id, ord)
+        ),
+        inserted as (
+            insert into threads (thread_id, user_id)
+            select thread_id, user_id from input where rn = 1 and user_ok
+            on conflict (thread_id) do nothing
+            returning thread_id, created_at
+        )
+        select i.idx,
+               i.thread_id,
+               case
+                   when i.rn > 1 then 'duplicate'
+                   when not i.user_ok then 'user_not_found'
+                   when ins.thread_id is not null then 'created'
+                   else 'exists'
+               end as outcome,
+               case
+                   when i.rn = 1 and not i.user_ok then null
+                   else to_char(coalesce(ins.created_at, th.created_at) at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"')
+               end as created_at
+          from input i
+          left join inserted ins on ins.thread_id = i.thread_id
+          left join threads th on th.thread_id = i.thread_id
+         order by i.idx
+        """,
+        (list(thread_ids), users),
+        row_factory=class_row(ThreadBatchRecord),
+        commit=True,
+    )
 
 
 async def get_thread_created_at(thread_id: str) -> Optional[str]:
-    pool = get_pool()
-    async with pool.connection() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute(
-                """
-                select to_char(created_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"')
-                  from threads
-                 where thread_id = %s
-                """,
-                (thread_id,),
-            )
-            row = await cur.fetchone()
-            return row[0] if row else None
+    row = await fetch_one(
+        f"select {_CREATED_AT_SQL} from threads where thread_id = %s",
+        (thread_id,),
+    )
+    return row[0] if row else None
 
 
-async def list_threads(limit: int = 50) -> List[Tuple[str, str]]:
-    pool = get_pool()
-    async with pool.connection() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute(
-                """
-                select thread_id,
-                       to_char(created_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as created
-                  from threads
-                 order by created_at desc
-                 limit %s
-                """,
-                (limit,),
-            )
-            rows = await cur.fetchall()
-            return [(r[0], r[1]) for r in rows]
+def _list_query(user_id: Optional[UUID], limit: int, after: Optional[ThreadKey]) -> Query:
+    # Variantes estáticas (com/sem user_id, com/sem keyset): cada uma tem seu plano preparado
+    where = []
+    params: list = []
+    if user_id is not None:
+        where.append("user_id = %s")
+        params.append(str(user_id))
+    if after:
+        where.append("(created_at, thread_id) < (%s, %s)")
+        params.extend(after)
+    return Query(
+        f"""
+        select thread_id,
+               {_CREATED_AT_SQL} as created_at,
+               created_at as sort_key
+          from threads
+        {"where " + " and ".join(where) if where else ""}
+         order by created_at desc, thread_id desc
+         limit %s
+        """,
+        (*params, limit + 1),
+        _thread_row,
+    )
+
+
+async def list_threads(
+    limit: int = 50,
+    after: Optional[ThreadKey] = None,
+) -> Tuple[List[ThreadRecord], Optional[ThreadKey]]:
+    """
+    Threads mais recentes primeiro, paginadas por keyset em (created_at, thread_id).
+
+    after: chave do último item da página anterior. Retorna (linhas, chave do
+    último item) — a chave vem None quando não há próxima página.
+    """
+    q = _list_query(None, limit, after)
+    return _page(await fetch_all(q.sql, q.params, row_factory=q.row_factory), limit)
 
 
 async def list_threads_by_user_id(
     user_id: UUID,
     limit: int = 50,
-) -> List[Tuple[str, str]]:
-    pool = get_pool()
-    async with pool.connection() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute(
-                """
-                select thread_id,
-                       to_char(created_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as created
-                  from threads
-                 where user_id = %s
-                 order by created_at desc
-                 limit %s
-                """,
-                (str(user_id), limit),
-            )
-            rows = await cur.fetchall()
-            return [(r[0], r[1]) for r in rows]
+    after: Optional[ThreadKey] = None,
+) -> Tuple[List[ThreadRecord], Optional[ThreadKey]]:
+    """Mesmo que list_threads, filtrando por user_id."""
+    q = _list_query(user_id, limit, after)
+    return _page(await fetch_all(q.sql, q.params, row_factory=q.row_factory), limit)
+
+
+def _page(rows: List[ThreadRecord], limit: int) -> Tuple[List[ThreadRecord], Optional[ThreadKey]]:
+    page = rows[:limit]
+    next_key = (page[-1].sort_key, page[-1].thread_id) if len(rows) > limit and page else None
+    return page, next_key
 
 
 async def update_thread_user_id(thread_id: str, user_id: UUID) -> bool:
-    pool = get_pool()
-    async with pool.connection() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute(
+    updated = await execute(
+        """
+        update threads
+           set user_id = %s
+         where thread_id = %s
+        """,
+        (str(user_id), thread_id),
+    )
+    return updated > 0
+
+
+# -----------------------------
+# Perfil + threads em um round trip (pipeline)
+# -----------------------------
+def _profile_query(user_id: UUID) -> Query:
+    return Query(
+        f"select {profile_columns()} from user_profiles where id = %s",
+        (str(user_id),),
+        class_row(UserProfileRecord),
+    )
+
+
+async def list_threads_with_user_profile(
+    user_id: UUID,
+    limit: int = 50,
+    after: Optional[ThreadKey] = None,
+) -> Tuple[Optional[UserProfileRecord], List[ThreadRecord], Optional[ThreadKey]]:
+    """Lê o perfil e a página de threads dele juntos. Perfil None = não existe."""
+    profile, threads = await pipeline([_profile_query(user_id), _list_query(user_id, limit, after)])
+    rows, next_key = _page(threads.rows, limit)
+    return profile.first(), rows, next_key
+
+
+async def link_thread_to_user_profile(
+    thread_id: str,
+    user_id: UUID,
+) -> Tuple[Optional[UserProfileRecord], bool]:
+    """
+    Lê o perfil e vincula o thread a ele, na mesma transação e round trip.
+    O update só acontece se o perfil existir. Retorna (perfil, thread atualizado).
+    """
+    profile, updated = await pipeline(
+        [
+            _profile_query(user_id),
+            Query(
                 """
                 update threads
                    set user_id = %s
                  where thread_id = %s
+                   and exists (select 1 from user_profiles where id = %s)
                 """,
-                (str(user_id), thread_id),
-            )
-            updated = cur.rowcount or 0
-            await conn.commit()
-            return updated > 0
+                (str(user_id), thread_id, str(user_id)),
+            ),
+        ],
+        commit=True,
+    )
+    return profile.first(), updated.rowcount > 0
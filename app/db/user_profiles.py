@@ -1,142 +1,303 @@
 from __future__ import annotations
 
-from typing import Optional, Tuple
+from dataclasses import dataclass
+from typing import AsyncIterable, List, Optional, Sequence, Tuple
 from uuid import UUID
 
+from psycopg import errors as pg_errors
+from psycopg.rows import class_row
+
 from app.db.pool import get_pool
+from app.db.query import fetch_all, fetch_one
 
 
-async def create_user_profile(
-    *,
-    stack_user_id: Optional[UUID],
-    customer_profile: Optional[int],
-    name: Optional[str],
-    phone: Optional[str],
-) -> Tuple[str, Optional[str], Optional[int], Optional[str], Optional[str], str, str]:
-    pool = get_pool()
-    async with pool.connection() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute(
-                """
-                insert into user_profiles (stack_user_id, customer_profile, name, phone)
-                values (%s, %s, %s, %s)
-                returning
-                    id,
-                    stack_user_id,
-                    customer_profile,
-                    name,
-                    phone,
-                    to_char(created_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as created,
-                    to_char(updated_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as updated
-                """,
-                (stack_user_id, customer_profile, name, phone),
-            )
-            row = await cur.fetchone()
-            await conn.commit()
-            return row
-
-
-async def update_user_profile(
+@dataclass(slots=True)
+class UserProfileRecord:
+    id: UUID
+    stack_user_id: Optional[UUID]
+    customer_profile: Optional[int]
+    name: Optional[str]
+    phone: Optional[str]
+    created_at: str
+    updated_at: str
+
+
+def profile_columns(alias: str = "") -> str:
+    """Colunas de UserProfileRecord, na ordem dos campos (alias: prefixo da tabela)."""
+    p = f"{alias}." if alias else ""
+    return (
+        f"{p}id, {p}stack_user_id, {p}customer_profile, {p}name, {p}phone, "
+        f"""to_char({p}created_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as created_at, """
+        f"""to_char({p}updated_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as updated_at"""
+    )
+
+
+_PROFILE_COLUMNS = profile_columns()
+_profile_row = class_row(UserProfileRecord)
+
+# Tentativas quando um create concorrente vence a corrida (unique violation)
+_UPSERT_ATTEMPTS = 3
+
+_UPSERT_SQL = """
+with input as (
+    select %s::uuid as stack_user_id,
+           %s::int as customer_profile,
+           %s::text as name,
+           %s::text as phone
+),
+matches as (
+    select distinct up.id
+      from user_profiles up, input i
+     where (i.stack_user_id is not null and up.stack_user_id = i.stack_user_id)
+        or (i.customer_profile is not null and up.customer_profile = i.customer_profile)
+),
+updated as (
+    update user_profiles up
+       set stack_user_id = coalesce(i.stack_user_id, up.stack_user_id),
+           customer_profile = coalesce(i.customer_profile, up.customer_profile),
+           name = coalesce(i.name, up.name),
+           phone = coalesce(i.phone, up.phone),
+           updated_at = now()
+      from input i
+     where up.id in (select id from matches)
+       and (select count(*) from matches) = 1
+    returning up.*
+),
+inserted as (
+    insert into user_profiles (stack_user_id, customer_profile, name, phone)
+    select i.stack_user_id, i.customer_profile, i.name, i.phone
+      from input i
+     where not exists (select 1 from matches)
+    on conflict do nothing
+    returning *
+),
+result as (
+    select 'updated' as outcome, * from updated
+    union all
+    select 'created' as outcome, * from inserted
+)
+select outcome, {columns}
+  from result
+union all
+select 'conflict', null, null, null, null, null, null, null
+ where (select count(*) from matches) > 1
+""".format(columns=_PROFILE_COLUMNS)
+
+
+async def upsert_user_profile(
     *,
-    user_id: UUID,
     stack_user_id: Optional[UUID],
     customer_profile: Optional[int],
     name: Optional[str],
     phone: Optional[str],
-) -> Optional[Tuple[str, Optional[str], Optional[int], Optional[str], Optional[str], str, str]]:
-    pool = get_pool()
-    async with pool.connection() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute(
-                """
-                update user_profiles
-                   set stack_user_id = coalesce(%s, stack_user_id),
-                       customer_profile = coalesce(%s, customer_profile),
-                       name = coalesce(%s, name),
-                       phone = coalesce(%s, phone),
-                       updated_at = now()
-                 where id = %s
-                returning
-                    id,
-                    stack_user_id,
-                    customer_profile,
-                    name,
-                    phone,
-                    to_char(created_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as created,
-                    to_char(updated_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as updated
-                """,
-                (stack_user_id, customer_profile, name, phone, str(user_id)),
-            )
-            row = await cur.fetchone()
-            await conn.commit()
-            return row if row else None
-
-
-async def get_user_profile_by_id(user_id: UUID) -> Optional[Tuple[str, Optional[str], Optional[int], Optional[str], Optional[str], str, str]]:
-    pool = get_pool()
-    async with pool.connection() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute(
-                """
-                select id,
-                       stack_user_id,
-                       customer_profile,
-                       name,
-                       phone,
-                       to_char(created_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as created,
-                       to_char(updated_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as updated
-                  from user_profiles
-                 where id = %s
-                """,
-                (str(user_id),),
-            )
-            row = await cur.fetchone()
-            return row if row else None
-
-
-async def get_user_profile_by_stack_user_id(
-    stack_user_id: UUID,
-) -> Optional[Tuple[str, Optional[str], Optional[int], Optional[str], Optional[str], str, str]]:
-    pool = get_pool()
-    async with pool.connection() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute(
-                """
-                select id,
-                       stack_user_id,
-                       customer_profile,
-                       name,
-                       phone,
-                       to_char(created_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as created,
-                       to_char(updated_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as updated
-                  from user_profiles
-                 where stack_user_id = %s
-                """,
-                (str(stack_user_id),),
-            )
-            row = await cur.fetchone()
-            return row if row else None
-
-
-async def get_user_profile_by_customer_profile(
-    customer_profile: int,
-) -> Optional[Tuple[str, Optional[str], Optional[int], Optional[str], Optional[str], str, str]]:
+) -> Tuple[str, Optional[UserProfileRecord]]:
+    """
+    Cria ou atualiza o perfil em um único statement atômico.
+
+    Procura por stack_user_id e/ou customer_profile. Com um match, atualiza
+    (coalesce: campos None não sobrescrevem). Sem match, insere. Se os dois
+    ids apontam para perfis diferentes, nada muda.
+
+    Retorna (outcome, row) com outcome em "created", "updated" ou "conflict"
+    (row None). Se um create concorrente vencer a corrida, o statement é
+    repetido e passa a enxergar a linha criada.
+    """
+    params = (
+        str(stack_user_id) if stack_user_id is not None else None,
+        customer_profile,
+        name,
+        phone,
+    )
+    for attempt in range(1, _UPSERT_ATTEMPTS + 1):
+        try:
+            row = await fetch_one(_UPSERT_SQL, params, commit=True)
+        except pg_errors.UniqueViolation:
+            if attempt == _UPSERT_ATTEMPTS:
+                raise
+            continue
+        if row is None:
+            # insert perdeu a corrida (on conflict do nothing): repete
+            continue
+        if row[0] == "conflict":
+            return "conflict", None
+        return row[0], UserProfileRecord(*row[1:])
+    raise RuntimeError("upsert_user_profile: sem resultado após retries")
+
+
+async def get_user_profile_by_id(user_id: UUID) -> Optional[UserProfileRecord]:
+    return await fetch_one(
+        f"select {_PROFILE_COLUMNS} from user_profiles where id = %s",
+        (str(user_id),),
+        row_factory=_profile_row,
+    )
+
+
+async def get_user_profile_by_stack_user_id(stack_user_id: UUID) -> Optional[UserProfileRecord]:
+    return await fetch_one(
+        f"select {_PROFILE_COLUMNS} from user_profiles where stack_user_id = %s",
+        (str(stack_user_id),),
+        row_factory=_profile_row,
+    )
+
+
+async def get_user_profile_by_customer_profile(customer_profile: int) -> Optional[UserProfileRecord]:
+    return await fetch_one(
+        f"select {_PROFILE_COLUMNS} from user_profiles where customer_profile = %s",
+        (customer_profile,),
+        row_factory=_profile_row,
+    )
+
+
+# -----------------------------
+# Lote: import (COPY + merge) e lookup
+# -----------------------------
+ImportRow = Tuple[int, Optional[UUID], Optional[int], Optional[str], Optional[str]]
+
+
+@dataclass(slots=True)
+class ImportResultRecord:
+    idx: int
+    outcome: str
+    id: Optional[UUID]
+
+_IMPORT_STAGING_SQL = """
+create temp table user_profiles_import (
+    idx int not null,
+    stack_user_id uuid,
+    customer_profile int,
+    name text,
+    phone text
+) on commit drop
+"""
+
+_IMPORT_COPY_SQL = """
+copy user_profiles_import (idx, stack_user_id, customer_profile, name, phone) from stdin
+"""
+
+# Mesma regra do upsert unitário, aplicada ao lote inteiro:
+# - conflict: stack_user_id e customer_profile já pertencem a perfis diferentes;
+# - duplicate: a chave (ou o perfil de destino) já apareceu numa linha anterior do lote;
+# - updated/created: caso contrário, conforme exista ou não um perfil com a chave.
+_IMPORT_MERGE_SQL = """
+with resolved as (
+    select s.*,
+           bs.id as by_stack,
+           bc.id as by_customer,
+           coalesce(bs.id, bc.id) as target
+      from user_profiles_import s
+      left join user_profiles bs on bs.stack_user_id = s.stack_user_id
+      left join user_profiles bc on bc.customer_profile = s.customer_profile
+),
+ranked as (
+    select r.*,
+           case when r.stack_user_id is null then 1
+                else row_number() over (partition by r.stack_user_id order by r.idx) end as rn_stack,
+           case when r.customer_profile is null then 1
+                else row_number() over (partition by r.customer_profile order by r.idx) end as rn_customer,
+           case when r.target is null then 1
+                else row_number() over (partition by r.target order by r.idx) end as rn_target
+      from resolved r
+),
+classified as (
+    select r.*,
+           case
+               when r.by_stack is not null and r.by_customer is not null
+                    and r.by_stack <> r.by_customer then 'conflict'
+               when r.rn_stack > 1 or r.rn_customer > 1 or r.rn_target > 1 then 'duplicate'
+               when r.target is not null then 'updated'
+               else 'created'
+           end as outcome
+      from ranked r
+),
+updated as (
+    update user_profiles up
+       set stack_user_id = coalesce(c.stack_user_id, up.stack_user_id),
+           customer_profile = coalesce(c.customer_profile, up.customer_profile),
+           name = coalesce(c.name, up.name),
+           phone = coalesce(c.phone, up.phone),
+           updated_at = now()
+      from classified c
+     where c.outcome = 'updated'
+       and up.id = c.target
+    returning c.idx, up.id
+),
+inserted as (
+    insert into user_profiles (stack_user_id, customer_profile, name, phone)
+    select c.stack_user_id, c.customer_profile, c.name, c.phone
+      from classified c
+     where c.outcome = 'created'
+     order by c.idx
+    returning id, stack_user_id, customer_profile
+),
+inserted_idx as (
+    select c.idx, i.id
+      from inserted i
+      join classified c
+        on c.outcome = 'created'
+       and c.stack_user_id is not distinct from i.stack_user_id
+       and c.customer_profile is not distinct from i.customer_profile
+)
+select c.idx, c.outcome, coalesce(u.id, i.id, c.target) as id
+  from classified c
+  left join updated u on u.idx = c.idx
+  left join inserted_idx i on i.idx = c.idx
+ order by c.idx
+"""
+
+
+async def import_user_profiles(rows: AsyncIterable[ImportRow]) -> List[ImportResultRecord]:
+    """
+    Importa perfis em lote: COPY das linhas para uma tabela temporária e um
+    único merge (update/insert) em user_profiles, tudo em uma transação.
+
+    `rows` é consumido em streaming: (idx, stack_user_id, customer_profile,
+    name, phone), com ao menos uma das chaves preenchida. Retorna um
+    ImportResultRecord por linha, na ordem de idx; outcome em "created",
+    "updated", "conflict" ou "duplicate" (id do perfil existente, se houver).
+
+    A tabela user_profiles fica travada para escrita (leituras seguem) durante
+    o merge, para que upserts concorrentes não violem as chaves únicas no meio
+    do lote.
+    """
     pool = get_pool()
     async with pool.connection() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute(
-                """
-                select id,
-                       stack_user_id,
-                       customer_profile,
-                       name,
-                       phone,
-                       to_char(created_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as created,
-                       to_char(updated_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as updated
-                  from user_profiles
-                 where customer_profile = %s
-                """,
-                (customer_profile,),
-            )
-            row = await cur.fetchone()
-            return row if row else None
+        async with conn.transaction():
+            async with conn.cursor() as cur:
+                await cur.execute(_IMPORT_STAGING_SQL)
+                async with cur.copy(_IMPORT_COPY_SQL) as copy:
+                    async for idx, stack_user_id, customer_profile, name, phone in rows:
+                        await copy.write_row((idx, stack_user_id, customer_profile, name, phone))
+                await cur.execute("lock table user_profiles in share row exclusive mode")
+            # o merge roda uma vez por import e lê a tabela temporária: sem prepare
+            async with conn.cursor(row_factory=class_row(ImportResultRecord)) as cur:
+                await cur.execute(_IMPORT_MERGE_SQL, prepare=False)
+                return await cur.fetchall()
+
+
+async def lookup_user_profiles(
+    keys: Sequence[Tuple[Optional[UUID], Optional[int]]],
+) -> List[Tuple[Optional[UUID], Optional[UUID], Optional[UserProfileRecord]]]:
+    """
+    Resolve vários pares (stack_user_id, customer_profile) em uma única query
+    (unnest with ordinality). Retorna, na ordem de entrada,
+    (id achado por stack_user_id, id achado por customer_profile, perfil).
+    """
+    if not keys:
+        return []
+    rows = await fetch_all(
+        f"""
+        select bs.id,
+               bc.id,
+               {profile_columns("p")}
+          from unnest(%s::uuid[], %s::int[]) with ordinality as k(stack_user_id, customer_profile, ord)
+          left join user_profiles bs on bs.stack_user_id = k.stack_user_id
+          left join user_profiles bc on bc.customer_profile = k.customer_profile
+          left join user_profiles p on p.id = coalesce(bs.id, bc.id)
+         order by k.ord
+        """,
+        (
+            [str(s) if s is not None else None for s, _ in keys],
+            [c for _, c in keys],
+        ),
+    )
+    return [(r[0], r[1], UserProfileRecord(*r[2:]) if r[2] is not None else None) for r in rows]
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
@@ -13,7 +14,16 @@ from app.core.settings import get_settings
 from app.db import close_pool, init_pool, open_pool
 from app.db.migrator import run_migrations
 
+from app.services.agenda import init_agenda_cache
+from app.services.catalog import init_service_catalog
+from app.services.checkpoint_compaction import run_checkpoint_compactor
+from app.services.checkpoint_serde import build_checkpoint_serde
+from app.services.eligibility import init_eligibility_index, run_eligibility_refresher
 from app.services.graph import build_agent_graph, open_checkpointer
+from app.services.shared_cache import init_shared_cache
+from app.services.user_profile_cache import init_user_profile_cache
+from app.utils.cursor import NEXT_CURSOR_HEADER
+from app.utils.http_client import close_http_client
 
 from app.api.routers import health, threads, user_profiles
 
@@ -30,21 +40,79 @@ def create_app() -> FastAPI:
             settings.database_url,
             settings.db_pool_min_size,
             settings.db_pool_max_size,
+            prepared_statements=settings.db_prepared_statements,
         )
         await open_pool()
-        await run_migrations()
+        if settings.run_migrations_on_startup:
+            await run_migrations(lock_timeout_seconds=settings.migrations_lock_timeout_seconds)
 
-        checkpointer_stack, checkpointer = await open_checkpointer(settings.database_url)
+        checkpointer_stack, checkpointer = await open_checkpointer(
+            settings.database_url,
+            min_size=settings.checkpointer_pool_min_size,
+            max_size=settings.checkpointer_pool_max_size,
+            statement_timeout_ms=settings.checkpointer_statement_timeout_ms,
+            serde=build_checkpoint_serde(
+                enabled=settings.checkpoint_compression_enabled,
+                level=settings.checkpoint_zstd_level,
+                min_size=settings.checkpoint_zstd_min_size,
+                dictionary_path=settings.checkpoint_zstd_dict_path,
+            ),
+        )
         await checkpointer.setup()
 
         app.state.checkpointer_stack = checkpointer_stack
         app.state.checkpointer = checkpointer
         app.state.graph = build_agent_graph(checkpointer)
 
+        init_shared_cache(
+            ttl_seconds=settings.catalog_cache_ttl_seconds,
+            l1_ttl_seconds=settings.catalog_cache_l1_ttl_seconds,
+            enabled=settings.catalog_cache_enabled,
+        )
+        init_service_catalog(ttl_seconds=settings.service_catalog_ttl_seconds)
+        init_user_profile_cache(
+            max_entries=settings.user_profile_cache_max_entries,
+            ttl_seconds=settings.user_profile_cache_ttl_seconds,
+            enabled=settings.user_profile_cache_enabled,
+        )
+        init_agenda_cache(
+            ttl_seconds=settings.agenda_cache_ttl_seconds,
+            max_days=settings.agenda_cache_max_days,
+        )
+
+        background_tasks = []
+        if settings.eligibility_refresh_enabled:
+            index = init_eligibility_index(
+                ttl_seconds=settings.eligibility_ttl_seconds,
+                concurrency=settings.eligibility_refresh_concurrency,
+            )
+            background_tasks.append(
+                asyncio.create_task(
+                    run_eligibility_refresher(index, settings.eligibility_refresh_interval_seconds)
+                )
+            )
+        if settings.checkpoint_compaction_enabled:
+            background_tasks.append(
+                asyncio.create_task(
+                    run_checkpoint_compactor(
+                        settings.checkpoint_compaction_interval_seconds,
+                        keep_latest=settings.checkpoint_keep_latest,
+                        batch_size=settings.checkpoint_compaction_batch_size,
+                        min_idle_seconds=settings.checkpoint_compaction_min_idle_seconds,
+                        max_rows=settings.checkpoint_compaction_max_rows,
+                    )
+                )
+            )
+
         try:
             yield
         finally:
             # Shutdown
+            for task in background_tasks:
+                task.cancel()
+            await asyncio.gather(*background_tasks, return_exceptions=True)
+
+            await close_http_client()
             await close_pool()
 
             stack = getattr(app.state, "checkpointer_stack", None)
@@ -83,6 +151,7 @@ def create_app() -> FastAPI:
         allow_credentials=settings.allow_credentials,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER],
     )
 
     @app.middleware("http")
@@ -30,8 +30,30 @@ class ThreadObj(BaseModel):
     values: Dict[str, Any] = Field(default_factory=dict)
 
 
+class ThreadBatchCreate(BaseModel):
+    # Quantidade de threads sem usuário, ou um thread por item de user_ids
+    count: Optional[int] = Field(default=None, ge=1, le=500)
+    user_ids: Optional[List[Optional[UUID]]] = Field(default=None, max_length=500)
+
+
+class ThreadBatchResult(BaseModel):
+    index: int
+    # created | exists | duplicate | user_not_found
+    outcome: str
+    thread_id: str
+    created_at: Optional[datetime] = None
+
+
+class ThreadBatchResponse(BaseModel):
+    total: int
+    counts: Dict[str, int] = Field(default_factory=dict)
+    results: List[ThreadBatchResult] = Field(default_factory=list)
+
+
 class ThreadSearchRequest(BaseModel):
     limit: Optional[int] = 50
+    # Cursor opaco devolvido no header X-Next-Cursor da página anterior
+    cursor: Optional[str] = None
 
 
 # ---------- User Profiles ----------
@@ -57,6 +79,36 @@ class UserProfileThreadUpdate(BaseModel):
     thread_id: str
 
 
+class UserProfileKey(BaseModel):
+    stack_user_id: Optional[UUID] = None
+    customer_profile: Optional[int] = None
+
+
+class UserProfileLookupRequest(BaseModel):
+    keys: List[UserProfileKey] = Field(default_factory=list, max_length=1000)
+
+
+class UserProfileLookupResult(BaseModel):
+    index: int
+    # found | not_found | conflict | invalid
+    outcome: str
+    profile: Optional[UserProfileObj] = None
+
+
+class UserProfileImportResult(BaseModel):
+    index: int
+    # created | updated | conflict | duplicate | invalid
+    outcome: str
+    id: Optional[UUID] = None
+    error: Optional[str] = None
+
+
+class UserProfileImportResponse(BaseModel):
+    total: int
+    counts: Dict[str, int] = Field(default_factory=dict)
+    results: List[UserProfileImportResult] = Field(default_factory=list)
+
+
 # ---------- Runs ----------
 
 class RunRequest(BaseModel):
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+
+from app.utils.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+AGENDA_PAGE_SIZE = 200
+# Páginas buscadas em paralelo dentro de uma janela
+AGENDA_PAGE_CONCURRENCY = 4
+# Dias buscados à frente enquanto o consumidor processa o dia atual
+AGENDA_PREFETCH_DAYS = 3
+
+
+def parse_dt(dt_str: str) -> datetime:
+    # Suporta ISO com timezone (ex: 2026-01-20T14:00:00-03:00)
+    return datetime.fromisoformat(dt_str.replace("Z", "+00:00"))
+
+
+def agendamento_interval(ag: Dict[str, Any]) -> Optional[Tuple[datetime, datetime]]:
+    start_raw = ag.get("dataHoraInicio")
+    dur = ag.get("duracaoEmMinutos")
+    if not start_raw or dur is None:
+        return None
+    try:
+        start = parse_dt(start_raw)
+        end = start + timedelta(minutes=int(dur))
+        return start, end
+    except Exception:
+        return None
+
+
+class _ProfIntervals:
+    """Intervalos de um profissional: inícios ordenados + máximo acumulado dos fins."""
+
+    __slots__ = ("starts", "ends", "max_end")
+
+    def __init__(self, pairs: List[Tuple[float, float]]) -> None:
+        pairs.sort()
+        self.starts = array("d", (s for s, _ in pairs))
+        self.ends = array("d", (e for _, e in pairs))
+        self.max_end = array("d")
+        running = float("-inf")
+        for e in self.ends:
+            running = e if e > running else running
+            self.max_end.append(running)
+
+
+class AgendaIndex:
+    """
+    Índice de agendamentos por profissional para checagem de conflito em O(log n).
+
+    Cada agendamento é parseado uma única vez e guardado como (início, fim) em
+    segundos epoch. Como agendamentos do mesmo profissional podem se sobrepor,
+    mantemos o máximo acumulado dos fins: o slot [s, e) conflita se algum
+    agendamento com início < e termina depois de s, ou seja,
+    max_end[bisect_left(starts, e) - 1] > s.
+    """
+
+    def __init__(self, agendamentos: Iterable[Dict[str, Any]] = ()) -> None:
+        self._by_prof: Dict[Any, _ProfIntervals] = {}
+        self.add_many(agendamentos)
+
+    def add_many(self, agendamentos: Iterable[Dict[str, Any]]) -> None:
+        grouped: Dict[Any, List[Tuple[float, float]]] = {}
+        for ag in agendamentos:
+            pid = (ag.get("profissional") or {}).get("id")
+            if pid is None:
+                continue
+            itv = agendamento_interval(ag)
+            if not itv:
+                continue
+            grouped.setdefault(pid, []).append((itv[0].timestamp(), itv[1].timestamp()))
+
+        for pid, pairs in grouped.items():
+            existing = self._by_prof.get(pid)
+            if existing is not None:
+                pairs.extend(zip(existing.starts, existing.ends))
+            self._by_prof[pid] = _ProfIntervals(pairs)
+
+    def busy_intervals(self, profissional_id: Any) -> Tuple[array, array]:
+        """(inícios, fins) em segundos epoch, ordenados por início."""
+        intervals = self._by_prof.get(profissional_id)
+        if intervals is None:
+            return array("d"), array("d")
+        return intervals.starts, intervals.ends
+
+    def is_free(self, profissional_id: Any, slot_start: datetime, slot_end: datetime) -> bool:
+        intervals = self._by_prof.get(profissional_id)
+        if intervals is None:
+            return True
+        i = bisect_left(intervals.starts, slot_end.timestamp())
+        return i == 0 or intervals.max_end[i - 1] <= slot_start.timestamp()
+
+
+# -----------------------------
+# Busca paginada de /agendamentos
+# -----------------------------
+def _total_pages(resp: Dict[str, Any], page_size: int) -> Optional[int]:
+    total_pages = resp.get("totalPages")
+    if isinstance(total_pages, int):
+        return total_pages
+    total = resp.get("total")
+    if isinstance(total, int):
+        return max(1, math.ceil(total / page_size))
+    return None
+
+
+async def iter_agendamentos_pages(
+    data_inicio_iso: str,
+    data_fim_iso: str,
+    page_size: int = AGENDA_PAGE_SIZE,
+    concurrency: int = AGENDA_PAGE_CONCURRENCY,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Itera todas as páginas de /agendamentos da janela, em ordem.
+
+    A página 1 informa total/totalPages; as demais são buscadas em paralelo
+    (limitadas por `concurrency`) e entregues na ordem. Se a API não informar
+    o total, segue página a página até vir uma página incompleta.
+    """
+    http = get_http_client()
+
+    async def _page(page: int) -> Dict[str, Any]:
+        return await http.aget("/agendamentos", params={
+            "dataInicio": data_inicio_iso,
+            "dataFim": data_fim_iso,
+            "page": page,
+            "pageSize": page_size,
+        })
+
+    first = await _page(1)
+    data = first.get("data", []) or []
+    yield data
+
+    pages = _total_pages(first, page_size)
+    logger.debug("[agenda] %s..%s paginas=%s", data_inicio_iso, data_fim_iso, pages)
+    if pages is None:
+        page = 1
+        while len(data) >= page_size:
+            page += 1
+            data = (await _page(page)).get("data", []) or []
+            yield data
+        return
+
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def _bounded(page: int) -> Dict[str, Any]:
+        async with sem:
+            return await _page(page)
+
+    tasks = [asyncio.create_task(_bounded(p)) for p in range(2, pages + 1)]
+    try:
+        for task in tasks:
+            yield (await task).get("data", []) or []
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def fetch_agendamentos(data_inicio_iso: str, data_fim_iso: str) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    async for page in iter_agendamentos_pages(data_inicio_iso, data_fim_iso):
+        out.extend(page)
+    return out
+
+
+class AgendaCache:
+    """
+    Cache de agendamentos por dia (chave = início do dia em ISO, com offset).
+
+    Janelas que se sobrepõem compartilham os mesmos dias, então consultas
+    seguidas só buscam os dias ausentes ou vencidos (TTL). Limitado a
+    `max_days` dias (LRU). invalidate_at() descarta o dia que contém um
+    horário — usado após criar um agendamento — e invalida buscas que
+    estavam em andamento naquele momento (elas não gravam no cache).
+    """
+
+    def __init__(self, ttl_seconds: float = 30, max_days: int = 62) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_days = max(1, max_days)
+        self._days: "OrderedDict[str, Tuple[float, float, float, List[Dict[str, Any]]]]" = OrderedDict()
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def get(self, day_start: datetime) -> Optional[List[Dict[str, Any]]]:
+        if not self.enabled:
+            return None
+        key = day_start.isoformat()
+        entry = self._days.get(key)
+        if entry is None or (time.monotonic() - entry[0]) >= self.ttl_seconds:
+            self.misses += 1
+            return None
+        self._days.move_to_end(key)
+        self.hits += 1
+        return entry[3]
+
+    def put(self, day_start: datetime, data: List[Dict[str, Any]], epoch: int) -> None:
+        if not self.enabled or epoch != self.epoch:
+            return
+        key = day_start.isoformat()
+        begin = day_start.timestamp()
+        self._days[key] = (time.monotonic(), begin, begin + 86400, data)
+        self._days.move_to_end(key)
+        while len(self._days) > self.max_days:
+            self._days.popitem(last=False)
+
+    def invalidate_at(self, dt: datetime) -> int:
+        ts = dt.timestamp()
+        stale = [k for k, (_, begin, end, _) in self._days.items() if begin <= ts < end]
+        for k in stale:
+            del self._days[k]
+        self.epoch += 1
+        return len(stale)
+
+    def clear(self) -> None:
+        self._days.clear()
+        self.epoch += 1
+
+
+_agenda_cache: Optional[AgendaCache] = None
+
+
+def init_agenda_cache(ttl_seconds: float = 30, max_days: int = 62) -> AgendaCache:
+    global _agenda_cache
+    if _agenda_cache is None:
+        _agenda_cache = AgendaCache(ttl_seconds=ttl_seconds, max_days=max_days)
+    return _agenda_cache
+
+
+def get_agenda_cache() -> AgendaCache:
+    return _agenda_cache if _agenda_cache is not None else init_agenda_cache()
+
+
+async def iter_agendamentos_by_day(
+    window_start: datetime,
+    days: int,
+    prefetch_days: int = AGENDA_PREFETCH_DAYS,
+    cache: Optional[AgendaCache] = None,
+    stats: Optional[Dict[str, int]] = None,
+) -> AsyncIterator[Tuple[datetime, List[Dict[str, Any]]]]:
+    """
+    Entrega (início do dia, agendamentos do dia) em ordem cronológica.
+
+    Os próximos `prefetch_days` dias já ficam sendo buscados enquanto o
+    consumidor processa o atual; ao sair do loop (break/aclose) as buscas
+    pendentes são canceladas, então o consumidor pode parar cedo.
+
+    Com `cache`, dias ainda válidos não vão à API; `stats` (se informado)
+    recebe a contagem de hits/misses desta iteração.
+    """
+    day_starts = [window_start + timedelta(days=i) for i in range(max(1, days))]
+    if stats is not None:
+        stats.setdefault("hits", 0)
+        stats.setdefault("misses", 0)
+
+    async def _load(day_start: datetime) -> List[Dict[str, Any]]:
+        epoch = cache.epoch if cache is not None else 0
+        data = await fetch_agendamentos(day_start.isoformat(), (day_start + timedelta(days=1)).isoformat())
+        if cache is not None:
+            cache.put(day_start, data, epoch)
+        return data
+
+    def _schedule(day_start: datetime) -> Union[List[Dict[str, Any]], "asyncio.Task[List[Dict[str, Any]]]"]:
+        cached = cache.get(day_start) if cache is not None else None
+        if stats is not None:
+            stats["hits" if cached is not None else "misses"] += 1
+        if cached is not None:
+            return cached
+        return asyncio.create_task(_load(day_start))
+
+    pending: Dict[int, Any] = {}
+    try:
+        for i, day_start in enumerate(day_starts):
+            for j in range(i, min(len(day_starts), i + 1 + max(0, prefetch_days))):
+                if j not in pending:
+                    pending[j] = _schedule(day_starts[j])
+            item = pending.pop(i)
+            yield day_start, (item if isinstance(item, list) else await item)
+    finally:
+        tasks = [t for t in pending.values() if isinstance(t, asyncio.Task)]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.shared_cache import get_shared_cache
+from app.utils.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+CATALOG_PAGE_SIZE = 200
+
+
+def _norm(text: Any) -> str:
+    decomposed = unicodedata.normalize("NFD", str(text or "").lower())
+    return "".join(c for c in decomposed if unicodedata.category(c) != "Mn").strip()
+
+
+def _categoria_text(categoria: Any) -> str:
+    if isinstance(categoria, dict):
+        return str(categoria.get("nome") or "")
+    return str(categoria or "")
+
+
+def _compact_catalog_service(s: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": s.get("id"),
+        "nome": s.get("nome"),
+        "descricao": s.get("descricao"),
+        "categoria": s.get("categoria"),
+        "duracaoEmMinutos": s.get("duracaoEmMinutos"),
+        "preco": s.get("preco"),
+        "visivelParaCliente": s.get("visivelParaCliente"),
+    }
+
+
+@dataclass(frozen=True)
+class _Entry:
+    pos: int
+    service: Dict[str, Any]
+    nome_norm: str
+    categoria_norm: str
+    name_len: int
+
+
+class ServiceCatalog:
+    """
+    Cache do catálogo de /servicos com índice de busca pré-construído.
+
+    - nomes e categorias já normalizados (minúsculas, sem acento)
+    - by_name: nome normalizado -> primeira entrada com esse nome (match exato)
+    - postings: token -> posições das entradas que contêm o token
+
+    O match por substring de uma palavra é resolvido varrendo o vocabulário
+    (tokens distintos), que é bem menor que o catálogo, e unindo as postings.
+
+    Os termos de busca devem chegar já passados por _normalize_service_term
+    (aliases/stopwords ficam na camada de tools).
+    """
+
+    def __init__(self, ttl_seconds: float = 600) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._entries: List[_Entry] = []
+        self._by_id: Dict[Any, _Entry] = {}
+        self._by_name: Dict[str, _Entry] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._word_cache: Dict[str, Set[int]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    # -----------------------------
+    # Carga
+    # -----------------------------
+    def is_fresh(self) -> bool:
+        if self._loaded_at is None:
+            return False
+        return (time.monotonic() - self._loaded_at) < self.ttl_seconds
+
+    async def _download(self) -> List[Dict[str, Any]]:
+        http = get_http_client()
+        out: List[Dict[str, Any]] = []
+        page = 1
+        while True:
+            resp = await http.aget("/servicos", params={"page": page, "pageSize": CATALOG_PAGE_SIZE})
+            data = resp.get("data", []) or []
+            out.extend(_compact_catalog_service(s) for s in data)
+            total = resp.get("total")
+            if len(data) < CATALOG_PAGE_SIZE or (isinstance(total, int) and len(out) >= total):
+                return out
+            page += 1
+
+    def load(self, services: List[Dict[str, Any]]) -> None:
+        """Reconstrói o índice a partir de uma lista de serviços (já baixada)."""
+        entries: List[_Entry] = []
+        by_id: Dict[Any, _Entry] = {}
+        by_name: Dict[str, _Entry] = {}
+        postings: Dict[str, Set[int]] = {}
+        for raw in services:
+            service = _compact_catalog_service(raw)
+            entry = _Entry(
+                pos=len(entries),
+                service=service,
+                nome_norm=_norm(service.get("nome")),
+                categoria_norm=_norm(_categoria_text(service.get("categoria"))),
+                name_len=len(str(service.get("nome", ""))),
+            )
+            entries.append(entry)
+            by_id.setdefault(service.get("id"), entry)
+            by_name.setdefault(entry.nome_norm, entry)
+            for token in entry.nome_norm.split():
+                postings.setdefault(token, set()).add(entry.pos)
+
+        # troca atômica (do ponto de vista do event loop)
+        self._entries = entries
+        self._by_id = by_id
+        self._by_name = by_name
+        self._postings = postings
+        self._word_cache = {}
+        self._loaded_at = time.monotonic()
+
+    async def ensure_loaded(self) -> None:
+        if self.is_fresh():
+            return
+        async with self._lock:
+            if self.is_fresh():
+                return
+            started = time.monotonic()
+            self.load(await get_shared_cache().get_or_load("servicos", self._download))
+            logger.info(
+                "[catalog] servicos=%s tokens=%s %.0fms",
+                len(self._entries),
+                len(self._postings),
+                (time.monotonic() - started) * 1000,
+            )
+
+    # -----------------------------
+    # Consulta
+    # -----------------------------
+    @staticmethod
+    def _visible(entry: _Entry, somente_visiveis: Optional[bool]) -> bool:
+        return not somente_visiveis or bool(entry.service.get("visivelParaCliente"))
+
+    def _positions_for_word(self, word: str) -> Set[int]:
+        cached = self._word_cache.get(word)
+        if cached is not None:
+            return cached
+        positions: Set[int] = set()
+        for token, posting in self._postings.items():
+            if word in token:
+                positions |= posting
+        self._word_cache[word] = positions
+        return positions
+
+    def get(self, servico_id: Any, somente_visiveis: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+        entry = self._by_id.get(servico_id)
+        if entry is None or not self._visible(entry, somente_visiveis):
+            return None
+        return entry.service
+
+    def _ranked(
+        self,
+        term: str,
+        somente_visiveis: Optional[bool],
+        fuzzy: bool = True,
+    ) -> List[Tuple[int, _Entry]]:
+        """
+        Mesma precedência do matching original:
+          1) nome exato  2) contém o termo (mais curto primeiro)  3) sobreposição de palavras
+        Retorna (nível, entrada) na ordem de relevância. fuzzy=False para no nível 2.
+        """
+        t = _norm(term)
+        if not t:
+            return []
+
+        ranked: List[Tuple[int, _Entry]] = []
+        seen: Set[int] = set()
+
+        exact = self._by_name.get(t)
+        if exact is not None and self._visible(exact, somente_visiveis):
+            ranked.append((0, exact))
+            seen.add(exact.pos)
+
+        words = t.split()
+        candidates: Optional[Set[int]] = None
+        for w in words:
+            positions = self._positions_for_word(w)
+            candidates = positions if candidates is None else candidates & positions
+            if not candidates:
+                break
+        contains = [
+            self._entries[pos]
+            for pos in (candidates or ())
+            if pos not in seen and t in self._entries[pos].nome_norm
+        ]
+        contains = [e for e in contains if self._visible(e, somente_visiveis)]
+        contains.sort(key=lambda e: (e.name_len, e.pos))
+        for e in contains:
+            ranked.append((1, e))
+            seen.add(e.pos)
+        if not fuzzy:
+            return ranked
+
+        scores: Dict[int, int] = {}
+        for w in (w for w in words if len(w) >= 3):
+            for pos in self._positions_for_word(w):
+                if pos not in seen:
+                    scores[pos] = scores.get(pos, 0) + 1
+        overlap = [self._entries[pos] for pos in scores]
+        overlap = [e for e in overlap if self._visible(e, somente_visiveis)]
+        overlap.sort(key=lambda e: (-scores[e.pos], e.name_len, e.pos))
+        ranked.extend((2, e) for e in overlap)
+        return ranked
+
+    def pick(self, term: str, somente_visiveis: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+        ranked = self._ranked(term, somente_visiveis)
+        return ranked[0][1].service if ranked else None
+
+    def search(
+        self,
+        term: Optional[str] = None,
+        categoria: Optional[str] = None,
+        somente_visiveis: Optional[bool] = None,
+        fuzzy: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Filtra o catálogo por termo (ranqueado), categoria e visibilidade.
+
+        Por padrão o termo casa como o filtro `nome` da API (nome exato ou
+        contém o termo); fuzzy=True inclui também sobreposição de palavras.
+        """
+        if term:
+            entries = [e for _, e in self._ranked(term, somente_visiveis, fuzzy=fuzzy)]
+        else:
+            entries = [e for e in self._entries if self._visible(e, somente_visiveis)]
+        if categoria:
+            cat = _norm(categoria)
+            entries = [e for e in entries if cat in e.categoria_norm]
+        return [e.service for e in entries]
+
+
+_catalog: Optional[ServiceCatalog] = None
+
+
+def init_service_catalog(ttl_seconds: float = 600) -> ServiceCatalog:
+    global _catalog
+    if _catalog is None:
+        _catalog = ServiceCatalog(ttl_seconds=ttl_seconds)
+    return _catalog
+
+
+def get_service_catalog() -> ServiceCatalog:
+    return _catalog if _catalog is not None else init_service_catalog()
@@ -0,0 +1,169 @@
+"""
+Retenção/compactação dos checkpoints do LangGraph.
+
+Uso (CLI):
+    python -m app.services.checkpoint_compaction [--keep 5] [--batch-size 100] [--max-rows 5000] [--dry-run]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Tuple
+
+from app.db.checkpoints import compact_threads, count_compactable, list_idle_threads
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CompactionReport:
+    dry_run: bool = False
+    threads: int = 0
+    batches: int = 0
+    checkpoints_deleted: int = 0
+    writes_deleted: int = 0
+    blobs_deleted: int = 0
+    skipped: bool = False
+    elapsed_ms: float = 0.0
+
+
+async def compact_checkpoints(
+    keep_latest: int = 5,
+    batch_size: int = 100,
+    min_idle_seconds: float = 600,
+    pause_seconds: float = 0.05,
+    dry_run: bool = False,
+    max_rows: int = 5000,
+) -> CompactionReport:
+    """
+    Mantém os keep_latest checkpoints mais recentes por thread e apaga o resto
+    (checkpoints antigos, writes e blobs órfãos).
+
+    Percorre os threads ociosos em lotes de batch_size. Cada lote é apagado em
+    rodadas de no máximo max_rows linhas por tabela, uma transação curta por
+    rodada, com pausa entre rodadas para não disputar as tabelas com os runs.
+    Se outra réplica estiver compactando, para e marca skipped. Em dry_run só
+    conta o que seria apagado (select count(*), nada é apagado nem travado).
+    """
+    report = CompactionReport(dry_run=dry_run)
+    started = time.monotonic()
+    cursor = ""
+    while True:
+        thread_ids = await list_idle_threads(cursor, min_idle_seconds, batch_size)
+        if not thread_ids:
+            break
+        if dry_run:
+            result = await count_compactable(thread_ids, max(1, keep_latest))
+        else:
+            result = await _compact_batch(thread_ids, max(1, keep_latest), max(1, max_rows), pause_seconds)
+        if result is None:
+            report.skipped = True
+            logger.info("[compaction] outra réplica está compactando; encerrando")
+            break
+
+        report.batches += 1
+        report.threads += len(thread_ids)
+        report.checkpoints_deleted += result[0]
+        report.writes_deleted += result[1]
+        report.blobs_deleted += result[2]
+        cursor = thread_ids[-1]
+        if len(thread_ids) < batch_size:
+            break
+        await asyncio.sleep(pause_seconds)
+
+    report.elapsed_ms = (time.monotonic() - started) * 1000
+    logger.info("[compaction] %s", asdict(report))
+    return report
+
+
+async def _compact_batch(
+    thread_ids: List[str],
+    keep_latest: int,
+    max_rows: int,
+    pause_seconds: float,
+) -> Optional[Tuple[int, int, int]]:
+    """Rodadas de compact_threads no mesmo lote até nenhuma tabela bater max_rows."""
+    totals = [0, 0, 0]
+    while True:
+        result = await compact_threads(thread_ids, keep_latest, max_rows)
+        if result is None:
+            return None
+        for i, n in enumerate(result):
+            totals[i] += n
+        if all(n < max_rows for n in result):
+            return totals[0], totals[1], totals[2]
+        await asyncio.sleep(pause_seconds)
+
+
+async def run_checkpoint_compactor(
+    interval_seconds: float,
+    keep_latest: int = 5,
+    batch_size: int = 100,
+    min_idle_seconds: float = 600,
+    max_rows: int = 5000,
+) -> None:
+    """Loop de background. Erros são logados e o loop segue."""
+    while True:
+        try:
+            await compact_checkpoints(
+                keep_latest=keep_latest,
+                batch_size=batch_size,
+                min_idle_seconds=min_idle_seconds,
+                max_rows=max_rows,
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("[compaction] compactação falhou", exc_info=True)
+        await asyncio.sleep(interval_seconds)
+
+
+async def _cli(args: argparse.Namespace) -> None:
+    from app.db.pool import close_pool, init_pool, open_pool
+
+    database_url: Optional[str] = args.database_url
+    if not database_url:
+        from app.core.settings import get_settings
+
+        database_url = get_settings().database_url
+
+    init_pool(database_url, 1, 2)
+    await open_pool()
+    try:
+        report = await compact_checkpoints(
+            keep_latest=args.keep,
+            batch_size=args.batch_size,
+            min_idle_seconds=args.min_idle_seconds,
+            pause_seconds=args.pause,
+            dry_run=args.dry_run,
+            max_rows=args.max_rows,
+        )
+    finally:
+        await close_pool()
+
+    label = "seriam apagados" if report.dry_run else "apagados"
+    print(f"threads analisados: {report.threads} em {report.batches} lotes ({report.elapsed_ms:.0f} ms)")
+    print(f"checkpoints {label}: {report.checkpoints_deleted}")
+    print(f"writes {label}:      {report.writes_deleted}")
+    print(f"blobs {label}:       {report.blobs_deleted}")
+    if report.skipped:
+        print("interrompido: outra réplica está compactando")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compacta os checkpoints do LangGraph.")
+    parser.add_argument("--keep", type=int, default=5, help="checkpoints mantidos por thread")
+    parser.add_argument("--batch-size", type=int, default=100, help="threads por lote")
+    parser.add_argument("--max-rows", type=int, default=5000, help="linhas por tabela em cada transação")
+    parser.add_argument("--min-idle-seconds", type=float, default=600, help="ignora threads com atividade recente")
+    parser.add_argument("--pause", type=float, default=0.05, help="pausa entre lotes (segundos)")
+    parser.add_argument("--dry-run", action="store_true", help="só conta o que seria apagado")
+    parser.add_argument("--database-url", type=str, default=None, help="default: DATABASE_URL do Settings")
+    asyncio.run(_cli(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Serializer comprimido (zstd) para os checkpoints do LangGraph.
+
+Uso (CLI):
+    python -m app.services.checkpoint_serde report [--amostras 2000] [--dict caminho.zdict]
+    python -m app.services.checkpoint_serde train --saida caminho.zdict [--amostras 5000] [--tamanho 65536]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import zstandard
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+logger = logging.getLogger(__name__)
+
+ZSTD_SUFFIX = "+zstd"
+
+# Tipos que o saver grava sem passar por compressão útil
+_PASSTHROUGH_TYPES = {"empty", "null"}
+
+
+class ZstdSerializer(SerializerProtocol):
+    """
+    Envolve outro serializer (default: JsonPlusSerializer) e comprime os bytes com zstd.
+
+    - O tipo gravado ganha o sufixo "+zstd" (ex: "msgpack+zstd"); blobs antigos,
+      sem o sufixo, são lidos direto pelo serializer interno.
+    - Payloads menores que min_size ficam sem compressão (o ganho não paga o custo).
+    - Com dicionário, payloads pequenos/médios comprimem bem melhor. O id do
+      dicionário vai no frame, então é possível trocar o dicionário mantendo os
+      antigos em `extra_dictionaries` para leitura.
+    """
+
+    def __init__(
+        self,
+        inner: Optional[SerializerProtocol] = None,
+        level: int = 3,
+        min_size: int = 64,
+        dictionary: Optional[bytes] = None,
+        extra_dictionaries: Sequence[bytes] = (),
+    ) -> None:
+        self.inner = inner or JsonPlusSerializer()
+        self.level = level
+        self.min_size = max(0, min_size)
+        self._dict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        self._read_dicts: Dict[int, zstandard.ZstdCompressionDict] = {}
+        for raw in ([dictionary] if dictionary else []) + list(extra_dictionaries):
+            d = zstandard.ZstdCompressionDict(raw)
+            self._read_dicts[d.dict_id()] = d
+        # compressores/descompressores não são thread-safe
+        self._local = threading.local()
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        comp = getattr(self._local, "compressor", None)
+        if comp is None:
+            comp = self._local.compressor = zstandard.ZstdCompressor(
+                level=self.level,
+                dict_data=self._dict,
+                write_content_size=True,
+            )
+        return comp
+
+    def _decompressor(self, dict_id: int) -> zstandard.ZstdDecompressor:
+        cache = getattr(self._local, "decompressors", None)
+        if cache is None:
+            cache = self._local.decompressors = {}
+        dec = cache.get(dict_id)
+        if dec is None:
+            if dict_id and dict_id not in self._read_dicts:
+                raise ValueError(f"Dicionário zstd {dict_id} não configurado")
+            dec = cache[dict_id] = zstandard.ZstdDecompressor(dict_data=self._read_dicts.get(dict_id))
+        return dec
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor().compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        dict_id = zstandard.get_frame_parameters(data).dict_id
+        return self._decompressor(dict_id).decompress(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        typ, data = self.inner.dumps_typed(obj)
+        if typ in _PASSTHROUGH_TYPES or data is None or len(data) < self.min_size:
+            return typ, data
+        return f"{typ}{ZSTD_SUFFIX}", self.compress(data)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        typ, payload = data
+        if typ.endswith(ZSTD_SUFFIX):
+            return self.inner.loads_typed((typ[: -len(ZSTD_SUFFIX)], self.decompress(payload)))
+        return self.inner.loads_typed((typ, payload))
+
+
+def load_dictionary(path: str) -> Optional[bytes]:
+    if not path:
+        return None
+    p = Path(path)
+    if not p.exists():
+        logger.warning("[serde] dicionário zstd não encontrado: %s (seguindo sem dicionário)", path)
+        return None
+    return p.read_bytes()
+
+
+def build_checkpoint_serde(
+    enabled: bool = True,
+    level: int = 3,
+    min_size: int = 64,
+    dictionary_path: str = "",
+) -> Optional[SerializerProtocol]:
+    """Serializer para o AsyncPostgresSaver, ou None (default do LangGraph) se desativado."""
+    if not enabled:
+        return None
+    return ZstdSerializer(level=level, min_size=min_size, dictionary=load_dictionary(dictionary_path))
+
+
+# -----------------------------
+# CLI: relatório e treino de dicionário
+# -----------------------------
+async def _sample_payloads(limit: int) -> List[Tuple[str, bytes]]:
+    """Amostra (tipo, bytes) de checkpoint_blobs e checkpoint_writes, mais recentes primeiro."""
+    from app.db.pool import get_pool
+
+    pool = get_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                (select type, blob from checkpoint_blobs
+                  where blob is not null and type not in ('empty', 'null')
+                  order by version desc
+                  limit %s)
+                union all
+                (select type, blob from checkpoint_writes
+                  where type is not null
+                  order by checkpoint_id desc
+                  limit %s)
+                """,
+                (limit, limit),
+            )
+            rows = await cur.fetchall()
+    return [(r[0], bytes(r[1])) for r in rows]
+
+
+def _raw_payloads(samples: Iterable[Tuple[str, bytes]], serde: ZstdSerializer) -> List[bytes]:
+    """Bytes não comprimidos (descomprime o que já estiver em zstd)."""
+    out: List[bytes] = []
+    for typ, data in samples:
+        try:
+            out.append(serde.decompress(data) if typ.endswith(ZSTD_SUFFIX) else data)
+        except Exception:
+            logger.warning("[serde] amostra ignorada (tipo=%s)", typ)
+    return out
+
+
+def _report(raw: List[bytes], serde: ZstdSerializer, label: str) -> None:
+    total = sum(len(d) for d in raw)
+    started = time.perf_counter()
+    packed = [serde.compress(d) if len(d) >= serde.min_size else d for d in raw]
+    t_comp = time.perf_counter() - started
+    size = sum(len(d) for d in packed)
+    print(
+        f"{label:<16} {total / 1024:10.1f} KiB -> {size / 1024:10.1f} KiB "
+        f"razão {total / max(size, 1):5.2f}x  ({t_comp * 1000:.0f} ms)"
+    )
+
+
+async def _cli(args: argparse.Namespace) -> None:
+    from app.db.pool import close_pool, init_pool, open_pool
+
+    database_url = args.database_url
+    if not database_url:
+        from app.core.settings import get_settings
+
+        database_url = get_settings().database_url
+
+    dictionary = load_dictionary(args.dict) if getattr(args, "dict", None) else None
+    reader = ZstdSerializer(dictionary=dictionary)
+
+    init_pool(database_url, 1, 2)
+    await open_pool()
+    try:
+        raw = _raw_payloads(await _sample_payloads(args.amostras), reader)
+    finally:
+        await close_pool()
+
+    if not raw:
+        print("nenhum blob encontrado")
+        return
+
+    if args.command == "train":
+        trained = zstandard.train_dictionary(args.tamanho, raw, level=args.nivel)
+        Path(args.saida).write_bytes(trained.as_bytes())
+        print(f"dicionário {trained.dict_id()} ({len(trained.as_bytes())} bytes) gravado em {args.saida}")
+        dictionary = trained.as_bytes()
+
+    sizes = sorted(len(d) for d in raw)
+    print(f"amostras: {len(raw)}  mediana {sizes[len(sizes) // 2]} bytes  máx {sizes[-1]} bytes")
+    _report(raw, ZstdSerializer(level=args.nivel), f"zstd-{args.nivel}")
+    if dictionary:
+        _report(raw, ZstdSerializer(level=args.nivel, dictionary=dictionary), f"zstd-{args.nivel}+dict")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compressão dos checkpoints (zstd).")
+    parser.add_argument("--database-url", type=str, default=None, help="default: DATABASE_URL do Settings")
+    parser.add_argument("--nivel", type=int, default=3, help="nível zstd")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    report = sub.add_parser("report", help="razão de compressão sobre blobs reais")
+    report.add_argument("--amostras", type=int, default=2000)
+    report.add_argument("--dict", type=str, default=None, help="compara também com este dicionário")
+
+    train = sub.add_parser("train", help="treina um dicionário a partir dos blobs reais")
+    train.add_argument("--saida", type=str, required=True)
+    train.add_argument("--amostras", type=int, default=5000)
+    train.add_argument("--tamanho", type=int, default=64 * 1024, help="tamanho do dicionário (bytes)")
+
+    asyncio.run(_cli(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
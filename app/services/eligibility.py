@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from app.services.shared_cache import load_profissionais, load_servicos_do_profissional
+
+logger = logging.getLogger(__name__)
+
+
+class EligibilityIndex:
+    """
+    Índice em memória profissional <-> serviço.
+
+    - service_to_profs: servico_id -> {profissional_id}
+    - prof_to_services: profissional_id -> {servico_id}
+
+    O refresh é incremental: só reconsulta os profissionais cuja entrada passou
+    de metade do TTL (ou que ainda não foram carregados) e aplica cada resultado
+    isoladamente, sem nunca deixar o índice vazio para quem está lendo.
+    """
+
+    def __init__(self, ttl_seconds: float = 900, concurrency: int = 8) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.concurrency = max(1, concurrency)
+
+        self.service_to_profs: Dict[Any, Set[Any]] = {}
+        self.prof_to_services: Dict[Any, Set[Any]] = {}
+        self.profissionais: Dict[Any, Dict[str, Any]] = {}
+
+        self._prof_refreshed_at: Dict[Any, float] = {}
+        self._refreshed_at: Optional[float] = None
+        self._refresh_lock = asyncio.Lock()
+
+    # -----------------------------
+    # Leitura (O(1), sem I/O)
+    # -----------------------------
+    def is_fresh(self) -> bool:
+        if self._refreshed_at is None:
+            return False
+        return (time.monotonic() - self._refreshed_at) < self.ttl_seconds
+
+    def list_profissionais(self) -> Optional[List[Dict[str, Any]]]:
+        if not self.is_fresh():
+            return None
+        return list(self.profissionais.values())
+
+    def professional_ids_for(self, servico_id: Any) -> Optional[Set[Any]]:
+        """Ids dos profissionais aptos, ou None se o índice estiver expirado."""
+        if not self.is_fresh():
+            return None
+        return set(self.service_to_profs.get(servico_id, ()))
+
+    def service_ids_for(self, profissional_id: Any) -> Optional[Set[Any]]:
+        if not self.is_fresh():
+            return None
+        return set(self.prof_to_services.get(profissional_id, ()))
+
+    # -----------------------------
+    # Escrita
+    # -----------------------------
+    def _apply(self, profissional_id: Any, service_ids: Set[Any]) -> None:
+        previous = self.prof_to_services.get(profissional_id, set())
+        for sid in previous - service_ids:
+            profs = self.service_to_profs.get(sid)
+            if profs is not None:
+                profs.discard(profissional_id)
+                if not profs:
+                    self.service_to_profs.pop(sid, None)
+        for sid in service_ids - previous:
+            self.service_to_profs.setdefault(sid, set()).add(profissional_id)
+        self.prof_to_services[profissional_id] = service_ids
+        self._prof_refreshed_at[profissional_id] = time.monotonic()
+
+    def _drop(self, profissional_id: Any) -> None:
+        self._apply(profissional_id, set())
+        self.prof_to_services.pop(profissional_id, None)
+        self._prof_refreshed_at.pop(profissional_id, None)
+        self.profissionais.pop(profissional_id, None)
+
+    async def _fetch_profissionais(self) -> List[Dict[str, Any]]:
+        return await load_profissionais()
+
+    async def _fetch_service_ids(self, profissional_id: Any) -> Set[Any]:
+        servicos = await load_servicos_do_profissional(profissional_id)
+        return {s.get("id") for s in servicos if s.get("id") is not None}
+
+    async def refresh(self, force: bool = False) -> None:
+        async with self._refresh_lock:
+            started = time.monotonic()
+            profissionais = await self._fetch_profissionais()
+            current_ids = {p["id"] for p in profissionais if p.get("id") is not None}
+
+            for pid in set(self.prof_to_services) - current_ids:
+                self._drop(pid)
+            self.profissionais = {p["id"]: p for p in profissionais if p.get("id") is not None}
+
+            stale_after = self.ttl_seconds / 2
+            to_refresh = [
+                pid
+                for pid in current_ids
+                if force
+                or pid not in self._prof_refreshed_at
+                or (started - self._prof_refreshed_at[pid]) >= stale_after
+            ]
+
+            sem = asyncio.Semaphore(self.concurrency)
+            failures = 0
+
+            async def _one(pid: Any) -> None:
+                nonlocal failures
+                async with sem:
+                    try:
+                        self._apply(pid, await self._fetch_service_ids(pid))
+                    except Exception:
+                        failures += 1
+                        logger.warning("[eligibility] falha ao atualizar profissionalId=%s", pid, exc_info=True)
+
+            await asyncio.gather(*(_one(pid) for pid in to_refresh))
+
+            # Só considera o índice válido se todos os profissionais têm entrada
+            if all(pid in self._prof_refreshed_at for pid in current_ids):
+                self._refreshed_at = time.monotonic()
+
+            logger.info(
+                "[eligibility] refresh profissionais=%s atualizados=%s falhas=%s %.0fms",
+                len(current_ids),
+                len(to_refresh),
+                failures,
+                (time.monotonic() - started) * 1000,
+            )
+
+
+_index: Optional[EligibilityIndex] = None
+
+
+def init_eligibility_index(ttl_seconds: float = 900, concurrency: int = 8) -> EligibilityIndex:
+    global _index
+    if _index is None:
+        _index = EligibilityIndex(ttl_seconds=ttl_seconds, concurrency=concurrency)
+    return _index
+
+
+def get_eligibility_index() -> EligibilityIndex:
+    return _index if _index is not None else init_eligibility_index()
+
+
+async def run_eligibility_refresher(index: EligibilityIndex, interval_seconds: float) -> None:
+    """Loop de background: mantém o índice quente. Erros são logados e o loop segue."""
+    while True:
+        try:
+            await index.refresh()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("[eligibility] refresh falhou", exc_info=True)
+        await asyncio.sleep(interval_seconds)
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 from contextlib import AsyncExitStack
+from typing import Optional
 
 from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
 
 from app.core.settings import get_settings
 from app.ai.agent import AgentConfig, build_graph
@@ -42,9 +46,35 @@ def build_agent_graph(checkpointer: BaseCheckpointSaver):
     return build_graph(cfg=cfg, checkpointer=checkpointer, tools=tools)
 
 
-async def open_checkpointer(database_url: str) -> tuple[AsyncExitStack, AsyncPostgresSaver]:
-    """Cria e mantém um AsyncPostgresSaver ativo até o fechamento."""
+async def open_checkpointer(
+    database_url: str,
+    min_size: int = 1,
+    max_size: int = 10,
+    statement_timeout_ms: int = 0,
+    serde: Optional[SerializerProtocol] = None,
+) -> tuple[AsyncExitStack, AsyncPostgresSaver]:
+    """
+    Cria um AsyncPostgresSaver sobre um pool próprio, ativo até o fechamento.
+
+    - Pool dedicado: o saver exige autocommit/dict_row/prepare_threshold=0,
+      diferente do pool da aplicação (app/db/pool.py).
+    - Runs concorrentes usam conexões distintas (até max_size) em vez de
+      disputar uma única conexão.
+    - statement_timeout_ms > 0 limita cada statement do checkpointer.
+    - serde: serializer dos blobs/writes (ex: ZstdSerializer); None = default do LangGraph.
+    """
+    kwargs: dict = {"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row}
+    if statement_timeout_ms > 0:
+        kwargs["options"] = f"-c statement_timeout={int(statement_timeout_ms)}"
+
     stack = AsyncExitStack()
-    cm = AsyncPostgresSaver.from_conn_string(database_url)
-    saver = await stack.enter_async_context(cm)
-    return stack, saver
+    pool = AsyncConnectionPool(
+        conninfo=database_url,
+        open=False,
+        min_size=min_size,
+        max_size=max_size,
+        kwargs=kwargs,
+    )
+    await pool.open()
+    stack.push_async_callback(pool.close)
+    return stack, AsyncPostgresSaver(conn=pool, serde=serde)
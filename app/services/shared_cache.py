@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.db.catalog_cache import get_cache_entry, put_cache_entry, release_refresh, try_claim_refresh
+from app.utils.cache import LRUCache
+from app.utils.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+# Quanto esperar (no total) por outra réplica que está atualizando a chave
+_WAIT_INTERVAL_SECONDS = 0.2
+_WAIT_ATTEMPTS = 10
+
+_UNAVAILABLE = object()
+
+
+@dataclass
+class _L1Entry:
+    loaded_at: float
+    version: Optional[int]
+    payload: Any
+
+
+class SharedCache:
+    """
+    Cache de catálogo em dois níveis, compartilhado entre réplicas.
+
+    - L1: memória do processo, TTL curto (l1_ttl_seconds).
+    - L2: tabela catalog_cache no Postgres, com versão e expires_at (ttl_seconds).
+
+    Quando a entrada do L2 vence, só a réplica que consegue o lease
+    (try_claim_refresh) chama a Trinks e grava; as demais servem a versão
+    vencida (se houver) ou aguardam a gravação. Ao revalidar o L1, o payload
+    só é relido se a versão no L2 mudou.
+
+    Sem pool/banco disponível, cai para o loader direto (só L1).
+    Os payloads são compartilhados entre chamadores: não devem ser modificados.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 600,
+        l1_ttl_seconds: float = 60,
+        lease_seconds: float = 30,
+        enabled: bool = True,
+        max_entries: int = 512,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.l1_ttl_seconds = l1_ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.enabled = enabled
+        self._l1: LRUCache[_L1Entry] = LRUCache(max_entries=max_entries)
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.stats = {"l1_hits": 0, "l2_hits": 0, "stale_served": 0, "refreshes": 0, "fallbacks": 0}
+
+    def _l1_fresh(self, key: str) -> Optional[_L1Entry]:
+        entry = self._l1.peek(key)
+        if entry is not None and (time.monotonic() - entry.loaded_at) < self.l1_ttl_seconds:
+            return entry
+        return None
+
+    def _remember(self, key: str, version: Optional[int], payload: Any) -> Any:
+        self._l1.set(key, _L1Entry(loaded_at=time.monotonic(), version=version, payload=payload))
+        return payload
+
+    def invalidate(self, key: str) -> None:
+        """Descarta só o L1 (o L2 expira sozinho)."""
+        self._l1.pop(key)
+
+    async def _l2(self, call: Awaitable[Any]) -> Any:
+        try:
+            return await call
+        except RuntimeError:
+            # pool não inicializado (ex: scripts/CLI)
+            return _UNAVAILABLE
+        except Exception:
+            logger.warning("[shared_cache] L2 indisponível", exc_info=True)
+            return _UNAVAILABLE
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._l1_fresh(key)
+        if entry is not None:
+            self.stats["l1_hits"] += 1
+            return entry.payload
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._l1_fresh(key)
+            if entry is not None:
+                self.stats["l1_hits"] += 1
+                return entry.payload
+            if not self.enabled:
+                return self._remember(key, None, await loader())
+            return await self._through_l2(key, loader, self._l1.peek(key))
+
+    async def _through_l2(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        previous: Optional[_L1Entry],
+    ) -> Any:
+        stale: Optional[_L1Entry] = None
+        for _ in range(_WAIT_ATTEMPTS + 1):
+            known = previous.version if previous is not None else None
+            row = await self._l2(get_cache_entry(key, known))
+            if row is _UNAVAILABLE:
+                break
+            if row is not None:
+                version, fresh, payload = row
+                if payload is None and previous is not None and version == known:
+                    payload = previous.payload
+                if fresh:
+                    self.stats["l2_hits"] += 1
+                    return self._remember(key, version, payload)
+                stale = _L1Entry(loaded_at=0, version=version, payload=payload)
+
+            claimed = await self._l2(try_claim_refresh(key, self.lease_seconds))
+            if claimed is _UNAVAILABLE:
+                break
+            if claimed:
+                return await self._refresh(key, loader, stale)
+
+            # outra réplica está atualizando
+            if stale is not None:
+                self.stats["stale_served"] += 1
+                return self._remember(key, stale.version, stale.payload)
+            await asyncio.sleep(_WAIT_INTERVAL_SECONDS)
+
+        self.stats["fallbacks"] += 1
+        return self._remember(key, None, await loader())
+
+    async def _refresh(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        stale: Optional[_L1Entry],
+    ) -> Any:
+        try:
+            payload = await loader()
+        except Exception:
+            await self._l2(release_refresh(key))
+            if stale is None:
+                raise
+            logger.warning("[shared_cache] refresh de %s falhou; servindo versão vencida", key, exc_info=True)
+            self.stats["stale_served"] += 1
+            return self._remember(key, stale.version, stale.payload)
+        except BaseException:
+            await asyncio.shield(self._l2(release_refresh(key)))
+            raise
+
+        version = await self._l2(put_cache_entry(key, payload, self.ttl_seconds))
+        self.stats["refreshes"] += 1
+        logger.info("[shared_cache] %s atualizado versão=%s", key, version)
+        return self._remember(key, version if isinstance(version, int) else None, payload)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "l1_entries": len(self._l1)}
+
+
+_shared_cache: Optional[SharedCache] = None
+
+
+def init_shared_cache(
+    ttl_seconds: float = 600,
+    l1_ttl_seconds: float = 60,
+    enabled: bool = True,
+) -> SharedCache:
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = SharedCache(ttl_seconds=ttl_seconds, l1_ttl_seconds=l1_ttl_seconds, enabled=enabled)
+    return _shared_cache
+
+
+def get_shared_cache() -> SharedCache:
+    return _shared_cache if _shared_cache is not None else init_shared_cache()
+
+
+# -----------------------------
+# Loaders compactados (Trinks)
+# -----------------------------
+async def load_profissionais() -> List[Dict[str, Any]]:
+    async def _load() -> List[Dict[str, Any]]:
+        resp = await get_http_client().aget("/profissionais", params={"page": 1, "pageSize": 200})
+        data = resp.get("data", []) or []
+        return [{"id": p.get("id"), "nome": p.get("nome"), "apelido": p.get("apelido")} for p in data]
+
+    return await get_shared_cache().get_or_load("profissionais", _load)
+
+
+async def load_servicos_do_profissional(profissional_id: Any) -> List[Dict[str, Any]]:
+    async def _load() -> List[Dict[str, Any]]:
+        resp = await get_http_client().aget(
+            f"/profissionais/{profissional_id}/servicos",
+            params={"page": 1, "pageSize": 200},
+        )
+        data = resp.get("data", []) or []
+        return [
+            {
+                "id": s.get("id"),
+                "nome": s.get("nome"),
+                "duracaoEmMinutos": s.get("duracaoEmMinutos"),
+                "preco": s.get("preco"),
+                "visivelParaCliente": s.get("visivelParaCliente"),
+            }
+            for s in data
+        ]
+
+    return await get_shared_cache().get_or_load(f"profissional:{profissional_id}:servicos", _load)
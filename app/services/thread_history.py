@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+from app.db.checkpoints import get_latest_channel_blob
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidCursorError(ValueError):
+    """Cursor (id de mensagem) não encontrado no histórico."""
+
+
+async def load_thread_messages(checkpointer: Any, thread_id: str) -> List[BaseMessage]:
+    """
+    Mensagens do checkpoint mais recente do thread.
+
+    No Postgres lê e desserializa só o blob do canal "messages"; nos demais
+    casos (outro saver, blob ausente, erro) cai para aget_tuple.
+    """
+    if isinstance(checkpointer, AsyncPostgresSaver):
+        try:
+            typed = await get_latest_channel_blob(thread_id, "messages")
+        except Exception:
+            logger.warning("[history] leitura do blob falhou; usando aget_tuple", exc_info=True)
+            typed = None
+        if typed is not None:
+            if typed[0] == "empty":
+                return []
+            return checkpointer.serde.loads_typed(typed) or []
+
+    tup = await checkpointer.aget_tuple({"configurable": {"thread_id": thread_id}})
+    if tup and tup.checkpoint:
+        return tup.checkpoint.get("channel_values", {}).get("messages", []) or []
+    return []
+
+
+def window_messages(
+    messages: List[BaseMessage],
+    limit: Optional[int] = None,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+) -> Tuple[List[BaseMessage], Dict[str, Any]]:
+    """
+    Recorta uma janela do histórico usando ids de mensagem como cursor.
+
+    - after: mensagens depois do id (as `limit` mais antigas dessa faixa).
+    - before: mensagens antes do id (as `limit` mais recentes dessa faixa).
+    - nenhum: as `limit` mais recentes (sem limit: tudo).
+    """
+    start, end = 0, len(messages)
+    if before is not None or after is not None:
+        cursor = before if before is not None else after
+        pos = next((i for i, m in enumerate(messages) if getattr(m, "id", None) == cursor), None)
+        if pos is None:
+            raise InvalidCursorError(cursor)
+        if before is not None:
+            end = pos
+        else:
+            start = pos + 1
+
+    if limit is not None:
+        if after is not None:
+            end = min(end, start + limit)
+        else:
+            start = max(start, end - limit)
+
+    window = messages[start:end]
+    page = {
+        "total": len(messages),
+        "has_more_before": start > 0,
+        "has_more_after": end < len(messages),
+        "first_id": getattr(window[0], "id", None) if window else None,
+        "last_id": getattr(window[-1], "id", None) if window else None,
+    }
+    return window, page
@@ -0,0 +1,224 @@
+"""
+Cache read-through dos perfis (user_profiles), na frente das leituras do banco.
+
+Os routers usam as funções deste módulo, inclusive para as escritas, para que
+create/update/import invalidem o cache.
+"""
+from __future__ import annotations
+
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from app.db import threads as db_threads
+from app.db import user_profiles as db
+from app.db.threads import ThreadKey, ThreadRecord
+from app.db.user_profiles import ImportResultRecord, ImportRow, UserProfileRecord
+from app.utils.cache import LRUCache
+
+_KINDS = ("id", "stack_user_id", "customer_profile")
+
+
+class UserProfileCache:
+    """
+    LRU com TTL para perfis, indexado por id, stack_user_id e customer_profile.
+
+    - As linhas ficam em `_rows` (por id); stack_user_id/customer_profile são
+      apelidos que apontam para o id. Um apelido só vale se a linha atual ainda
+      tiver aquela chave, então trocar customer_profile num update não deixa
+      o apelido antigo servindo o perfil errado.
+    - Escritas locais atualizam/descartam a linha na hora. Escritas feitas por
+      outras réplicas aparecem no máximo após ttl_seconds.
+    - Ausências não são cacheadas (o perfil pode ser criado a qualquer momento).
+    - Uma leitura que começou antes de uma escrita não grava o resultado (geração).
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 30, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._rows: LRUCache[UserProfileRecord] = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._aliases: LRUCache[str] = LRUCache(max_entries=2 * max_entries, ttl_seconds=ttl_seconds)
+        self._generation = 0
+        self.stats: Dict[str, Dict[str, int]] = {k: {"hits": 0, "misses": 0} for k in _KINDS}
+        self.invalidations = 0
+
+    @staticmethod
+    def _matches(row: UserProfileRecord, kind: str, value: Any) -> bool:
+        if kind == "id":
+            return True
+        current = row.stack_user_id if kind == "stack_user_id" else row.customer_profile
+        return current is not None and str(current) == str(value)
+
+    def _lookup(self, kind: str, value: Any) -> Optional[UserProfileRecord]:
+        user_id = str(value) if kind == "id" else self._aliases.get((kind, str(value)))
+        row = self._rows.get(user_id) if user_id is not None else None
+        if row is not None and self._matches(row, kind, value):
+            return row
+        return None
+
+    def store(self, row: UserProfileRecord) -> None:
+        user_id = str(row.id)
+        self._rows.set(user_id, row)
+        if row.stack_user_id is not None:
+            self._aliases.set(("stack_user_id", str(row.stack_user_id)), user_id)
+        if row.customer_profile is not None:
+            self._aliases.set(("customer_profile", str(row.customer_profile)), user_id)
+
+    def invalidate(self, user_ids: Sequence[Any]) -> None:
+        """Descarta as linhas (os apelidos caem sozinhos)."""
+        self._generation += 1
+        self.invalidations += 1
+        for user_id in user_ids:
+            self._rows.pop(str(user_id))
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._rows.clear()
+        self._aliases.clear()
+
+    async def get(
+        self,
+        kind: str,
+        value: Any,
+        loader: Callable[[], Awaitable[Optional[UserProfileRecord]]],
+    ) -> Optional[UserProfileRecord]:
+        if not self.enabled:
+            return await loader()
+
+        row = self.cached(kind, value)
+        if row is not None:
+            return row
+
+        generation = self._generation
+        row = await loader()
+        if row is not None and generation == self._generation:
+            self.store(row)
+        return row
+
+    def cached(self, kind: str, value: Any) -> Optional[UserProfileRecord]:
+        """Só o cache (conta hit/miss); None se ausente ou desativado."""
+        if not self.enabled:
+            return None
+        row = self._lookup(kind, value)
+        self.stats[kind]["hits" if row is not None else "misses"] += 1
+        return row
+
+    def metrics(self) -> Dict[str, Any]:
+        hits = sum(s["hits"] for s in self.stats.values())
+        lookups = hits + sum(s["misses"] for s in self.stats.values())
+        return {
+            "enabled": self.enabled,
+            "size": len(self._rows),
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "by_key": self.stats,
+            "evictions": self._rows.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+_user_profile_cache: Optional[UserProfileCache] = None
+
+
+def init_user_profile_cache(
+    max_entries: int = 10_000,
+    ttl_seconds: float = 30,
+    enabled: bool = True,
+) -> UserProfileCache:
+    global _user_profile_cache
+    if _user_profile_cache is None:
+        _user_profile_cache = UserProfileCache(max_entries=max_entries, ttl_seconds=ttl_seconds, enabled=enabled)
+    return _user_profile_cache
+
+
+def get_user_profile_cache() -> UserProfileCache:
+    return _user_profile_cache if _user_profile_cache is not None else init_user_profile_cache()
+
+
+# -----------------------------
+# Leituras (cacheadas)
+# -----------------------------
+async def get_user_profile_by_id(user_id: UUID) -> Optional[UserProfileRecord]:
+    return await get_user_profile_cache().get("id", user_id, lambda: db.get_user_profile_by_id(user_id))
+
+
+async def get_user_profile_by_stack_user_id(stack_user_id: UUID) -> Optional[UserProfileRecord]:
+    return await get_user_profile_cache().get(
+        "stack_user_id", stack_user_id, lambda: db.get_user_profile_by_stack_user_id(stack_user_id)
+    )
+
+
+async def get_user_profile_by_customer_profile(customer_profile: int) -> Optional[UserProfileRecord]:
+    return await get_user_profile_cache().get(
+        "customer_profile", customer_profile, lambda: db.get_user_profile_by_customer_profile(customer_profile)
+    )
+
+
+# -----------------------------
+# Escritas (invalidam o cache)
+# -----------------------------
+async def upsert_user_profile(
+    *,
+    stack_user_id: Optional[UUID],
+    customer_profile: Optional[int],
+    name: Optional[str],
+    phone: Optional[str],
+) -> Tuple[str, Optional[UserProfileRecord]]:
+    cache = get_user_profile_cache()
+    outcome, row = await db.upsert_user_profile(
+        stack_user_id=stack_user_id,
+        customer_profile=customer_profile,
+        name=name,
+        phone=phone,
+    )
+    if row is not None:
+        cache.invalidate([row.id])
+        cache.store(row)
+    return outcome, row
+
+
+async def import_user_profiles(rows: AsyncIterable[ImportRow]) -> List[ImportResultRecord]:
+    cache = get_user_profile_cache()
+    merged = await db.import_user_profiles(rows)
+    # perfis criados não estavam no cache (ausências não são cacheadas)
+    cache.invalidate([r.id for r in merged if r.outcome == "updated"])
+    return merged
+
+
+# -----------------------------
+# Perfil + threads
+# -----------------------------
+async def list_user_profile_threads(
+    user_id: UUID,
+    limit: int = 50,
+    after: Optional[ThreadKey] = None,
+) -> Optional[Tuple[List[ThreadRecord], Optional[ThreadKey]]]:
+    """
+    Página de threads do perfil, ou None se o perfil não existe. Com o perfil
+    em cache vai só a query dos threads; sem, perfil e threads vão juntos
+    (pipeline).
+    """
+    cache = get_user_profile_cache()
+    if cache.cached("id", user_id) is not None:
+        return await db_threads.list_threads_by_user_id(user_id, limit=limit, after=after)
+
+    generation = cache._generation
+    profile, rows, next_key = await db_threads.list_threads_with_user_profile(user_id, limit=limit, after=after)
+    if profile is None:
+        return None
+    if generation == cache._generation:
+        cache.store(profile)
+    return rows, next_key
+
+
+async def link_thread_to_user_profile(user_id: UUID, thread_id: str) -> Tuple[Optional[UserProfileRecord], bool]:
+    """(perfil, thread vinculado). Sem o perfil em cache, leitura e update vão juntos."""
+    cache = get_user_profile_cache()
+    profile = cache.cached("id", user_id)
+    if profile is not None:
+        return profile, await db_threads.update_thread_user_id(thread_id, user_id)
+
+    generation = cache._generation
+    profile, updated = await db_threads.link_thread_to_user_profile(thread_id, user_id)
+    if profile is not None and generation == cache._generation:
+        cache.store(profile)
+    return profile, updated
@@ -0,0 +1,106 @@
+"""
+Parsing em streaming do import de perfis (NDJSON ou CSV).
+
+As linhas válidas seguem direto para o COPY (import_user_profiles); as
+inválidas ficam em `invalid` para entrar no relatório por linha.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.db.user_profiles import ImportRow
+from app.models.schemas import UserProfileCreate
+
+# Teto de linhas por request (acima disso o lote inteiro é recusado)
+MAX_IMPORT_ROWS = 50_000
+
+
+class ImportTooLargeError(ValueError):
+    pass
+
+
+def import_format(content_type: Optional[str]) -> Optional[str]:
+    """Formato a partir do Content-Type (text/csv, application/x-ndjson, ...)."""
+    ct = (content_type or "").split(";")[0].strip().lower()
+    if "csv" in ct:
+        return "csv"
+    if "ndjson" in ct or "jsonl" in ct or "json" in ct:
+        return "ndjson"
+    return None
+
+
+async def _iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    buf = b""
+    async for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if buf:
+        yield buf.decode("utf-8-sig").rstrip("\r")
+
+
+def _validate(data: Any) -> Tuple[Optional[UserProfileCreate], Optional[str]]:
+    if not isinstance(data, dict):
+        return None, "linha deve ser um objeto"
+    try:
+        body = UserProfileCreate.model_validate(data)
+    except ValidationError as e:
+        first = e.errors()[0]
+        loc = ".".join(str(p) for p in first.get("loc", ()))
+        return None, f"{loc}: {first.get('msg')}" if loc else str(first.get("msg"))
+    if body.stack_user_id is None and body.customer_profile is None:
+        return None, "stack_user_id ou customer_profile é obrigatório"
+    return body, None
+
+
+def _csv_record(header: List[str], line: str) -> Dict[str, Any]:
+    values = next(csv.reader([line]))
+    if len(values) != len(header):
+        raise ValueError(f"esperadas {len(header)} colunas, encontradas {len(values)}")
+    # célula vazia = campo ausente (não sobrescreve no merge)
+    return {k: v for k, v in zip(header, values) if v != ""}
+
+
+async def parse_import_stream(
+    chunks: AsyncIterable[bytes],
+    fmt: str,
+    invalid: List[Tuple[int, str]],
+) -> AsyncIterator[ImportRow]:
+    """
+    Gera ImportRow para cada linha válida. idx é a posição da linha de dados
+    (0-based, sem contar linhas em branco nem o cabeçalho do CSV); linhas
+    inválidas vão para `invalid` como (idx, erro).
+
+    O CSV precisa de cabeçalho com os nomes dos campos (stack_user_id,
+    customer_profile, name, phone); valores com quebra de linha não são
+    suportados.
+    """
+    header: Optional[List[str]] = None
+    idx = 0
+    async for line in _iter_lines(chunks):
+        if not line.strip():
+            continue
+        if fmt == "csv" and header is None:
+            header = [h.strip() for h in next(csv.reader([line]))]
+            continue
+        if idx >= MAX_IMPORT_ROWS:
+            raise ImportTooLargeError(f"máximo de {MAX_IMPORT_ROWS} linhas por import")
+
+        try:
+            data = _csv_record(header, line) if fmt == "csv" else json.loads(line)
+        except (ValueError, csv.Error) as e:
+            invalid.append((idx, str(e) or "linha inválida"))
+            idx += 1
+            continue
+
+        body, error = _validate(data)
+        if body is None:
+            invalid.append((idx, error))
+        else:
+            yield (idx, body.stack_user_id, body.customer_profile, body.name, body.phone)
+        idx += 1
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, thread_id: str) -> str:
+    """Cursor opaco (base64url) para paginação keyset por (created_at, thread_id)."""
+    raw = json.dumps({"c": created_at.isoformat(), "t": thread_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverso de encode_cursor. ValueError se o cursor for inválido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        created_at = datetime.fromisoformat(data["c"])
+        thread_id = data["t"]
+    except Exception as exc:
+        raise ValueError("cursor inválido") from exc
+    if not isinstance(thread_id, str) or created_at.tzinfo is None:
+        raise ValueError("cursor inválido")
+    return created_at, thread_id
+
+
+def parse_cursor_or_400(cursor: Optional[str]) -> Optional[Tuple[datetime, str]]:
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def set_next_cursor(response: Response, next_key: Optional[Tuple[datetime, str]]) -> None:
+    """Publica o cursor da próxima página no header X-Next-Cursor (se houver)."""
+    if next_key is not None:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*next_key)
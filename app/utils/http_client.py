@@ -1,26 +1,382 @@
 from __future__ import annotations
 
+import asyncio
+import json as jsonlib
 import logging
 import os
-from typing import Any, Dict, Optional
+import random
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
 
+import httpx
 import requests
 from dotenv import load_dotenv
 
+from app.utils.cache import LRUCache
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _parse_path_ttls(raw: str) -> Dict[str, float]:
+    """"/servicos=300,/agendamentos=15" -> {"/servicos": 300.0, "/agendamentos": 15.0}"""
+    out: Dict[str, float] = {}
+    for item in (raw or "").split(","):
+        if "=" not in item:
+            continue
+        path, ttl = item.split("=", 1)
+        path = path.strip()
+        if not path:
+            continue
+        try:
+            out[path if path.startswith("/") else f"/{path}"] = float(ttl)
+        except ValueError:
+            logger.warning("HTTP_CACHE_TTLS inválido: %s", item)
+    return out
+
+
+def request_key(path: str, params: Optional[Mapping[str, Any]]) -> str:
+    """Chave canônica de um GET: caminho + params ordenados (mesma chave = mesma requisição)."""
+    canonical = jsonlib.dumps(params or {}, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{path}?{canonical}"
+
+
 class HttpClientError(Exception):
     """Erro específico para chamadas HTTP do agente SVIM."""
 
 
+class CircuitOpenError(HttpClientError):
+    """Circuito aberto: a chamada falhou rápido sem ir à rede."""
+
+
+# -----------------------------
+# Cache de respostas (GET)
+# -----------------------------
+@dataclass
+class CachedResponse:
+    body: Any
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+
+class ResponseCache:
+    """
+    Cache de respostas GET com revalidação condicional.
+
+    - Respeita Cache-Control: no-store (não guarda), no-cache (guarda, mas sempre
+      revalida) e max-age.
+    - TTL por prefixo de caminho (ex: "/servicos" -> 300s) tem precedência sobre
+      o max-age do servidor; sem nenhum dos dois, usa default_ttl.
+    - Entradas vencidas com ETag/Last-Modified são revalidadas com
+      If-None-Match/If-Modified-Since; um 304 renova a entrada sem baixar o corpo.
+    - Memória limitada por LRU (max_entries).
+
+    O corpo devolvido é compartilhado entre chamadas: não deve ser modificado.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        default_ttl: float = 0,
+        path_ttls: Optional[Mapping[str, float]] = None,
+    ) -> None:
+        self.default_ttl = default_ttl
+        # prefixos mais longos primeiro
+        self.path_ttls = sorted((path_ttls or {}).items(), key=lambda kv: -len(kv[0]))
+        self._entries: LRUCache[CachedResponse] = LRUCache(max_entries=max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def _path_ttl(self, path: str) -> Optional[float]:
+        for prefix, ttl in self.path_ttls:
+            if path.startswith(prefix):
+                return ttl
+        return None
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.peek(key)
+        if entry is not None and entry.is_fresh():
+            # hit renova a posição na LRU; entrada vencida só é lida para revalidar
+            self._entries.get(key)
+            self.hits += 1
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry: Optional[CachedResponse]) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def _ttl(self, path: str, headers: Mapping[str, str]) -> Optional[float]:
+        """TTL para a resposta; None = não armazenar."""
+        directives = {
+            d.strip().split("=", 1)[0].lower(): (d.split("=", 1)[1].strip() if "=" in d else "")
+            for d in (headers.get("cache-control") or "").split(",")
+            if d.strip()
+        }
+        if "no-store" in directives:
+            return None
+        override = self._path_ttl(path)
+        if override is not None:
+            return override
+        if "no-cache" in directives:
+            return 0
+        if "max-age" in directives:
+            try:
+                return max(0.0, float(directives["max-age"]))
+            except ValueError:
+                pass
+        return self.default_ttl
+
+    def store(self, key: str, path: str, headers: Mapping[str, str], body: Any) -> None:
+        self.misses += 1
+        ttl = self._ttl(path, headers)
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        if ttl is None or (ttl <= 0 and not etag and not last_modified):
+            self._entries.pop(key)
+            return
+        self._entries.set(
+            key,
+            CachedResponse(
+                body=body,
+                etag=etag,
+                last_modified=last_modified,
+                expires_at=time.monotonic() + ttl,
+            ),
+        )
+
+    def not_modified(self, key: str, path: str, entry: CachedResponse, headers: Mapping[str, str]) -> Any:
+        self.revalidated += 1
+        ttl = self._ttl(path, headers)
+        entry.expires_at = time.monotonic() + (ttl or 0)
+        entry.etag = headers.get("etag") or entry.etag
+        entry.last_modified = headers.get("last-modified") or entry.last_modified
+        self._entries.set(key, entry)
+        return entry.body
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "evictions": self._entries.evictions,
+            "hit_rate": round((self.hits + self.revalidated) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# -----------------------------
+# Resiliência (retry, circuit breaker, hedge)
+# -----------------------------
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_key(method: str, path: str) -> str:
+    """"GET /profissionais/42/servicos" -> "GET /profissionais/{id}/servicos"."""
+    return f"{method.upper()} {_ID_SEGMENT.sub('/{id}', path.split('?', 1)[0])}"
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Retry para GETs (idempotentes) em erro de conexão/timeout, 5xx e 429.
+    Espera entre tentativas: backoff exponencial com full jitter,
+    uniform(0, min(max_delay, base_delay * 2**(tentativa-1))); Retry-After
+    (em segundos) é respeitado, limitado a max_delay.
+    """
+
+    max_attempts: int = 3
+    base_delay: float = 0.2
+    max_delay: float = 2.0
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            max_attempts=max(1, int(os.getenv("HTTP_RETRY_MAX_ATTEMPTS", 3))),
+            base_delay=float(os.getenv("HTTP_RETRY_BASE_DELAY", 0.2)),
+            max_delay=float(os.getenv("HTTP_RETRY_MAX_DELAY", 2.0)),
+        )
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(self.max_delay, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    """
+    Hedge de GETs: se a resposta não chegou após o percentil `percentile` das
+    latências recentes do endpoint, dispara uma segunda requisição idêntica e
+    usa a primeira que responder. Só atua com `min_samples` amostras.
+    """
+
+    enabled: bool = False
+    percentile: float = 95.0
+    min_samples: int = 20
+    min_delay: float = 0.05
+
+    @classmethod
+    def from_env(cls) -> "HedgePolicy":
+        return cls(
+            enabled=_env_bool("HTTP_HEDGE_ENABLED", False),
+            percentile=float(os.getenv("HTTP_HEDGE_PERCENTILE", 95)),
+            min_samples=int(os.getenv("HTTP_HEDGE_MIN_SAMPLES", 20)),
+            min_delay=float(os.getenv("HTTP_HEDGE_MIN_DELAY", 0.05)),
+        )
+
+
+class LatencyWindow:
+    """Últimas N latências (segundos) de um endpoint."""
+
+    def __init__(self, size: int = 200) -> None:
+        self._samples: "deque[float]" = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+        return ordered[idx]
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por endpoint.
+
+    - closed: chamadas passam; `failure_threshold` falhas seguidas abrem o circuito.
+    - open: chamadas falham na hora (CircuitOpenError) por `reset_timeout` segundos.
+    - half_open: passado o reset_timeout, uma única chamada de prova vai à rede;
+      sucesso fecha o circuito, falha reabre.
+
+    Falha = erro de conexão/timeout ou 5xx. 4xx conta como sucesso (a API está no ar).
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def before_call(self, endpoint: str) -> None:
+        if self.state == "closed":
+            return
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"CIRCUIT_OPEN {endpoint}")
+            self.state = "half_open"
+        if self._probing:
+            raise CircuitOpenError(f"CIRCUIT_OPEN {endpoint}")
+        self._probing = True
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info("[http] circuito fechado")
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._probing = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning("[http] circuito aberto após %s falhas", self.failures)
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Chamada cancelada: libera a vaga de prova sem contar sucesso/falha."""
+        self._probing = False
+
+
+def _is_retryable_status(status: int) -> bool:
+    return status == 429 or status >= 500
+
+
+class _Flight:
+    """GET em voo compartilhado (singleflight) e quantos chamadores o aguardam."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Dict[str, Any]]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
 class HttpClient:
-    """HTTP client com configuração fixa e validações de segurança."""
+    """
+    HTTP client com configuração fixa e validações de segurança.
+
+    - get/post: caminho síncrono (requests.Session, mantém keep-alive).
+    - aget/apost: caminho assíncrono sobre um httpx.AsyncClient compartilhado,
+      com pool de conexões keep-alive e HTTP/2, circuit breaker por endpoint,
+      retry com jitter (só GET) e hedge opcional (só GET).
+
+    base_url/transport/retry/hedge podem ser injetados (ex: stub local em testes).
 
-    def __init__(self) -> None:
-        base_url = os.getenv("TRINKS_API_URL", "").rstrip("/")
+    Env:
+      - HTTP_TIMEOUT (default: 10)
+      - HTTP_HTTP2 (default: true)
+      - HTTP_MAX_CONNECTIONS (default: 20)
+      - HTTP_MAX_KEEPALIVE_CONNECTIONS (default: 10)
+      - HTTP_KEEPALIVE_EXPIRY (default: 30 segundos)
+      - HTTP_CACHE_ENABLED (default: false) — cache de respostas GET
+      - HTTP_CACHE_MAX_ENTRIES (default: 512)
+      - HTTP_CACHE_DEFAULT_TTL (default: 0 — só revalida via ETag/Last-Modified)
+      - HTTP_CACHE_TTLS (ex: "/servicos=300,/profissionais=300,/agendamentos=15")
+      - HTTP_RETRY_MAX_ATTEMPTS (default: 3), HTTP_RETRY_BASE_DELAY (0.2), HTTP_RETRY_MAX_DELAY (2.0)
+      - HTTP_CB_FAILURE_THRESHOLD (default: 5), HTTP_CB_RESET_SECONDS (default: 30)
+      - HTTP_HEDGE_ENABLED (default: false), HTTP_HEDGE_PERCENTILE (95),
+        HTTP_HEDGE_MIN_SAMPLES (20), HTTP_HEDGE_MIN_DELAY (0.05)
+      - HTTP_COALESCE_ENABLED (default: true) — GETs idênticos concorrentes viram uma requisição
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        retry: Optional[RetryPolicy] = None,
+        hedge: Optional[HedgePolicy] = None,
+    ) -> None:
+        base_url = (base_url or os.getenv("TRINKS_API_URL", "")).rstrip("/")
         if not base_url:
             raise ValueError("TRINKS_API_URL não definida para o cliente HTTP da SVIM")
         self.base_url = base_url
@@ -34,6 +390,38 @@ class HttpClient:
 
         self.timeout = float(os.getenv("HTTP_TIMEOUT", 10))
 
+        self.http2 = _env_bool("HTTP_HTTP2", True)
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", 20)),
+            max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 10)),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30)),
+        )
+
+        self.response_cache: Optional[ResponseCache] = None
+        if _env_bool("HTTP_CACHE_ENABLED", False):
+            self.response_cache = ResponseCache(
+                max_entries=int(os.getenv("HTTP_CACHE_MAX_ENTRIES", 512)),
+                default_ttl=float(os.getenv("HTTP_CACHE_DEFAULT_TTL", 0)),
+                path_ttls=_parse_path_ttls(os.getenv("HTTP_CACHE_TTLS", "")),
+            )
+
+        self.retry = retry or RetryPolicy.from_env()
+        self.hedge = hedge or HedgePolicy.from_env()
+        self._cb_failure_threshold = int(os.getenv("HTTP_CB_FAILURE_THRESHOLD", 5))
+        self._cb_reset_seconds = float(os.getenv("HTTP_CB_RESET_SECONDS", 30))
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyWindow] = {}
+        self.stats = {"retries": 0, "hedged": 0, "hedge_wins": 0, "circuit_rejections": 0}
+
+        self.coalesce = _env_bool("HTTP_COALESCE_ENABLED", True)
+        self.coalesced = 0
+        self._inflight: Dict[str, _Flight] = {}
+
+        self._transport = transport
+        self._session = requests.Session()
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_lock = asyncio.Lock()
+
     def _full_url(self, path: str) -> str:
         if path.startswith("http://") or path.startswith("https://"):
             if not path.startswith(self.base_url):
@@ -43,11 +431,27 @@ class HttpClient:
             path = f"/{path}"
         return f"{self.base_url}{path}"
 
-    def _request(self, method: str, path: str, **kwargs: Any) -> Dict[str, Any]:
+    @staticmethod
+    def _log_http_error(method: str, url: str, status: Optional[int], body: str) -> str:
+        body_preview = body.replace("\n", " ")[:500]
+        print(
+            f"[SVIM] HTTP error method={method} url={url} status={status} body={body_preview}"
+        )
+        return body_preview
+
+    @staticmethod
+    def _json(resp: Any) -> Any:
+        try:
+            return resp.json()
+        except ValueError as exc:  # pragma: no cover - JSON inválido
+            logger.error("Invalid JSON from HTTP client", exc_info=exc)
+            raise HttpClientError("INVALID_JSON_RESPONSE") from exc
+
+    def _send(self, method: str, path: str, **kwargs: Any) -> requests.Response:
         url = self._full_url(path)
         headers = {**self.headers, **kwargs.pop("headers", {})}
         try:
-            resp = requests.request(
+            resp = self._session.request(
                 method,
                 url,
                 headers=headers,
@@ -55,7 +459,7 @@ class HttpClient:
                 **kwargs,
             )
             resp.raise_for_status()
-            return resp.json()
+            return resp
         except requests.exceptions.HTTPError as exc:  # pragma: no cover - comportamento de rede
             response = exc.response
             body = ""
@@ -66,24 +470,264 @@ class HttpClient:
                     body = response.text or ""
                 except Exception:
                     body = ""
-            body_preview = body.replace("\n", " ")[:500]
-            print(
-                f"[SVIM] HTTP error method={method} url={url} status={status} body={body_preview}"
-            )
+            body_preview = self._log_http_error(method, url, status, body)
             raise HttpClientError(f"{exc} | body={body_preview}") from exc
         except requests.exceptions.RequestException as exc:  # pragma: no cover - comportamento de rede
             logger.error("HTTP client error", exc_info=exc)
             raise HttpClientError(str(exc)) from exc
-        except ValueError as exc:  # pragma: no cover - JSON inválido
-            logger.error("Invalid JSON from HTTP client", exc_info=exc)
-            raise HttpClientError("INVALID_JSON_RESPONSE") from exc
+
+    def _request(self, method: str, path: str, **kwargs: Any) -> Dict[str, Any]:
+        return self._json(self._send(method, path, **kwargs))
 
     def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        return self._request("GET", path, params=params or {})
+        params = params or {}
+        cache = self.response_cache
+        if cache is None:
+            return self._request("GET", path, params=params)
+
+        key = request_key(path, params)
+        entry = cache.lookup(key)
+        if entry is not None and entry.is_fresh():
+            return entry.body
+        resp = self._send("GET", path, params=params, headers=cache.conditional_headers(entry))
+        if resp.status_code == 304 and entry is not None:
+            return cache.not_modified(key, path, entry, resp.headers)
+        body = self._json(resp)
+        cache.store(key, path, resp.headers, body)
+        return body
 
     def post(self, path: str, json: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         return self._request("POST", path, json=json or {})
 
+    # -----------------------------
+    # Async (httpx)
+    # -----------------------------
+    async def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is not None and not self._async_client.is_closed:
+            return self._async_client
+        async with self._async_lock:
+            if self._async_client is None or self._async_client.is_closed:
+                self._async_client = httpx.AsyncClient(
+                    headers=self.headers,
+                    timeout=self.timeout,
+                    limits=self.limits,
+                    http2=self.http2,
+                    transport=self._transport,
+                )
+        return self._async_client
+
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = self._breakers[endpoint] = CircuitBreaker(
+                failure_threshold=self._cb_failure_threshold,
+                reset_timeout=self._cb_reset_seconds,
+            )
+        return breaker
+
+    def _latency(self, endpoint: str) -> LatencyWindow:
+        window = self._latencies.get(endpoint)
+        if window is None:
+            window = self._latencies[endpoint] = LatencyWindow()
+        return window
+
+    def _hedge_delay(self, endpoint: str) -> Optional[float]:
+        if not self.hedge.enabled:
+            return None
+        window = self._latency(endpoint)
+        if len(window) < self.hedge.min_samples:
+            return None
+        return max(self.hedge.min_delay, window.percentile(self.hedge.percentile) or 0.0)
+
+    async def _attempt(
+        self, client: httpx.AsyncClient, method: str, url: str, endpoint: str, **kwargs: Any
+    ) -> httpx.Response:
+        started = time.monotonic()
+        resp = await client.request(method, url, **kwargs)
+        if not _is_retryable_status(resp.status_code):
+            self._latency(endpoint).observe(time.monotonic() - started)
+        return resp
+
+    async def _hedged(
+        self, client: httpx.AsyncClient, method: str, url: str, endpoint: str, **kwargs: Any
+    ) -> httpx.Response:
+        """Envia a requisição; passado o limiar de hedge, dispara uma cópia e fica com a primeira boa."""
+        delay = self._hedge_delay(endpoint)
+        if delay is None:
+            return await self._attempt(client, method, url, endpoint, **kwargs)
+
+        primary = asyncio.create_task(self._attempt(client, method, url, endpoint, **kwargs))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.stats["hedged"] += 1
+                tasks.add(asyncio.create_task(self._attempt(client, method, url, endpoint, **kwargs)))
+
+            fallback: Optional[httpx.Response] = None
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    resp = task.result()
+                    if not _is_retryable_status(resp.status_code):
+                        if task is not primary:
+                            self.stats["hedge_wins"] += 1
+                        return resp
+                    fallback = resp
+            if fallback is not None:
+                return fallback
+            assert error is not None
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _asend(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        url = self._full_url(path)
+        kwargs["headers"] = kwargs.pop("headers", None)
+        endpoint = endpoint_key(method, httpx.URL(url).path)
+        breaker = self._breaker(endpoint)
+        idempotent = method.upper() == "GET"
+        attempts = self.retry.max_attempts if idempotent else 1
+        client = await self._get_async_client()
+
+        for attempt in range(1, attempts + 1):
+            try:
+                breaker.before_call(endpoint)
+            except CircuitOpenError:
+                self.stats["circuit_rejections"] += 1
+                raise
+            try:
+                if idempotent:
+                    resp = await self._hedged(client, method, url, endpoint, **kwargs)
+                else:
+                    resp = await self._attempt(client, method, url, endpoint, **kwargs)
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except httpx.HTTPError as exc:  # pragma: no cover - comportamento de rede
+                breaker.record_failure()
+                if attempt < attempts:
+                    self.stats["retries"] += 1
+                    wait = self.retry.delay(attempt)
+                    logger.warning(
+                        "[http] %s falhou (%s); tentativa %s em %.2fs",
+                        endpoint, exc.__class__.__name__, attempt + 1, wait,
+                    )
+                    await asyncio.sleep(wait)
+                    continue
+                logger.error("HTTP client error", exc_info=exc)
+                raise HttpClientError(str(exc) or exc.__class__.__name__) from exc
+
+            if resp.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if _is_retryable_status(resp.status_code) and attempt < attempts:
+                self.stats["retries"] += 1
+                wait = self.retry.delay(attempt, resp.headers.get("retry-after"))
+                logger.warning(
+                    "[http] %s status=%s; tentativa %s em %.2fs",
+                    endpoint, resp.status_code, attempt + 1, wait,
+                )
+                await asyncio.sleep(wait)
+                continue
+
+            if resp.status_code == 304:
+                return resp
+            try:
+                resp.raise_for_status()
+            except httpx.HTTPStatusError as exc:  # pragma: no cover - comportamento de rede
+                body_preview = self._log_http_error(method, url, resp.status_code, resp.text or "")
+                raise HttpClientError(f"{exc} | body={body_preview}") from exc
+            return resp
+
+        raise HttpClientError(f"Sem resposta para {method} {url}")  # pragma: no cover - inalcançável
+
+    async def _arequest(self, method: str, path: str, **kwargs: Any) -> Dict[str, Any]:
+        return self._json(await self._asend(method, path, **kwargs))
+
+    async def aget(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        GET assíncrono. Com coalescing ligado, GETs idênticos concorrentes
+        (mesmo caminho + params canônicos) compartilham uma única requisição
+        em voo e o mesmo resultado (ou exceção) — o corpo não deve ser modificado.
+        """
+        params = params or {}
+        key = request_key(path, params)
+        cache = self.response_cache
+        if cache is not None:
+            entry = cache.lookup(key)
+            if entry is not None and entry.is_fresh():
+                return entry.body
+        if not self.coalesce:
+            return await self._aget(path, params, key)
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = self._inflight[key] = _Flight(asyncio.ensure_future(self._aget(path, params, key)))
+            flight.task.add_done_callback(lambda _t, k=key, f=flight: self._land(k, f))
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # ninguém mais espera: cancela e não deixa novos chamadores pegarem a carona
+                self._land(key, flight)
+                flight.task.cancel()
+
+    def _land(self, key: str, flight: "_Flight") -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    async def _aget(self, path: str, params: Dict[str, Any], key: str) -> Dict[str, Any]:
+        cache = self.response_cache
+        if cache is None:
+            return await self._arequest("GET", path, params=params)
+
+        entry = cache.lookup(key)
+        if entry is not None and entry.is_fresh():
+            return entry.body
+        resp = await self._asend("GET", path, params=params, headers=cache.conditional_headers(entry))
+        if resp.status_code == 304 and entry is not None:
+            return cache.not_modified(key, path, entry, resp.headers)
+        body = self._json(resp)
+        cache.store(key, path, resp.headers, body)
+        return body
+
+    async def apost(self, path: str, json: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self._arequest("POST", path, json=json or {})
+
+    async def aclose(self) -> None:
+        """Fecha o pool assíncrono e a sessão síncrona."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        self._session.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "response_cache": self.response_cache.metrics() if self.response_cache else None,
+            "coalescing": {"deduplicated": self.coalesced, "inflight": len(self._inflight)},
+            "resilience": {
+                **self.stats,
+                "circuits": {
+                    endpoint: {"state": b.state, "failures": b.failures}
+                    for endpoint, b in self._breakers.items()
+                    if b.state != "closed" or b.failures
+                },
+            },
+        }
+
 
 _default_client: Optional[HttpClient] = None
 
@@ -95,4 +739,31 @@ def get_http_client() -> HttpClient:
     return _default_client
 
 
-__all__ = ["HttpClient", "HttpClientError", "get_http_client"]
+def http_client_metrics() -> Dict[str, Any]:
+    """Métricas do cliente padrão, sem instanciá-lo."""
+    return _default_client.metrics() if _default_client is not None else {}
+
+
+async def close_http_client() -> None:
+    """Fecha o cliente padrão (se criado). Usado no shutdown da aplicação."""
+    global _default_client
+    if _default_client is not None:
+        await _default_client.aclose()
+        _default_client = None
+
+
+__all__ = [
+    "CachedResponse",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "HedgePolicy",
+    "HttpClient",
+    "HttpClientError",
+    "ResponseCache",
+    "RetryPolicy",
+    "close_http_client",
+    "endpoint_key",
+    "get_http_client",
+    "http_client_metrics",
+    "request_key",
+]
@@ -25,7 +25,7 @@ def lc_message_to_dict(msg: BaseMessage) -> Dict[str, Any]:
         role = getattr(msg, "type", "unknown") or "unknown"
 
     content = getattr(msg, "content", "")
-    return {"role": role, "content": content}
+    return {"id": getattr(msg, "id", None), "role": role, "content": content}
 
 
 def lc_messages_to_list(messages: List[BaseMessage]) -> List[Dict[str, Any]]:
@@ -0,0 +1,101 @@
+"""
+Benchmark: overhead por query da camada app.db.query.
+
+Compara, na mesma conexão do pool (pool de tamanho 1, para isolar o custo
+da query do custo de disputar conexões):
+
+- lookup de perfil por id: SQL sem prepare (antes, nas primeiras execuções
+  de cada conexão), prepare automático do psycopg (após 5 execuções) e
+  prepare=True + class_row (camada nova);
+- perfil + página de threads: duas queries sequenciais (antes) x pipeline.
+
+Precisa de um banco com as migrações aplicadas (só lê; ids aleatórios).
+
+Uso:
+    python -m benchmarks.bench_db_queries --database-url postgresql://... [--iteracoes 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import Awaitable, Callable, List
+
+from app.db.pool import close_pool, get_pool, init_pool, open_pool
+from app.db.threads import list_threads_by_user_id, list_threads_with_user_profile
+from app.db.user_profiles import get_user_profile_by_id, profile_columns
+
+_PROFILE_SQL = f"select {profile_columns()} from user_profiles where id = %s"
+
+
+async def _measure(label: str, fn: Callable[[], Awaitable[object]], n: int, warmup: int = 20) -> float:
+    for _ in range(warmup):
+        await fn()
+    samples: List[float] = []
+    for _ in range(n):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    mean = statistics.fmean(samples)
+    p50 = samples[len(samples) // 2]
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{label:<44} média {mean:8.1f} µs   p50 {p50:8.1f} µs   p99 {p99:8.1f} µs")
+    return mean
+
+
+def _raw_profile_lookup(prepare):
+    async def run() -> object:
+        async with get_pool().connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(_PROFILE_SQL, (str(uuid.uuid4()),), prepare=prepare)
+                return await cur.fetchone()
+
+    return run
+
+
+async def _run(args: argparse.Namespace) -> None:
+    init_pool(args.database_url, 1, 1)
+    await open_pool()
+    n = args.iteracoes
+    try:
+        print(f"{n} iterações por cenário\n")
+        print("lookup de perfil por id")
+        before = await _measure("  sem prepare (tuple_row)", _raw_profile_lookup(False), n)
+        await _measure("  prepare automático do psycopg", _raw_profile_lookup(None), n)
+        after = await _measure(
+            "  camada nova (prepare=True, class_row)",
+            lambda: get_user_profile_by_id(uuid.uuid4()),
+            n,
+        )
+        print(f"  ganho vs sem prepare: {before - after:+.1f} µs/query ({before / max(after, 1e-9):.2f}x)\n")
+
+        print("perfil + página de threads")
+
+        async def sequential() -> object:
+            user_id = uuid.uuid4()
+            await get_user_profile_by_id(user_id)
+            return await list_threads_by_user_id(user_id, limit=50)
+
+        before = await _measure("  duas queries sequenciais", sequential, n)
+        after = await _measure(
+            "  pipeline (um round trip)",
+            lambda: list_threads_with_user_profile(uuid.uuid4(), limit=50),
+            n,
+        )
+        print(f"  ganho: {before - after:+.1f} µs/chamada ({before / max(after, 1e-9):.2f}x)")
+    finally:
+        await close_pool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Overhead por query (prepare/pipeline/row factories).")
+    parser.add_argument("--database-url", type=str, required=True)
+    parser.add_argument("--iteracoes", type=int, default=2000)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
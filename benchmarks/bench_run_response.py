@@ -0,0 +1,108 @@
+"""
+Benchmark: montar a resposta do run (releitura do checkpoint x estado devolvido pelo grafo).
+
+Usa um grafo mínimo (um nó que responde com uma AIMessage) sobre um histórico
+de --mensagens mensagens. Sem --database-url usa o InMemorySaver (mede só a
+desserialização); com --database-url usa o AsyncPostgresSaver (inclui o round trip).
+
+Uso:
+    python -m benchmarks.bench_run_response [--mensagens 200] [--runs 50] [--database-url postgresql://...]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import uuid
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from app.api.routers.threads import final_messages
+
+
+def _build_graph(checkpointer: Any):
+    def responder(state: MessagesState) -> Dict[str, Any]:
+        return {"messages": [AIMessage(content="ok " * 40)]}
+
+    g = StateGraph(MessagesState)
+    g.add_node("responder", responder)
+    g.add_edge(START, "responder")
+    g.add_edge("responder", END)
+    return g.compile(checkpointer=checkpointer)
+
+
+def _history(n: int) -> List[Any]:
+    out: List[Any] = []
+    for i in range(n // 2):
+        out.append(HumanMessage(content=f"pergunta {i} " + "x" * 200))
+        out.append(AIMessage(content=f"resposta {i} " + "y" * 400))
+    return out
+
+
+async def _open_saver(stack: AsyncExitStack, database_url: Optional[str]) -> Any:
+    if not database_url:
+        return InMemorySaver()
+    from app.services.graph import open_checkpointer
+
+    saver_stack, saver = await open_checkpointer(database_url)
+    stack.push_async_callback(saver_stack.aclose)
+    await saver.setup()
+    return saver
+
+
+async def _run(args: argparse.Namespace) -> None:
+    async with AsyncExitStack() as stack:
+        saver = await _open_saver(stack, args.database_url)
+        graph = _build_graph(saver)
+        thread_id = str(uuid.uuid4())
+        cfg = {"configurable": {"thread_id": thread_id}}
+        await graph.ainvoke({"messages": _history(args.mensagens)}, config=cfg)
+
+        t_state = 0.0
+        t_checkpoint = 0.0
+        stream_ok = True
+        for _ in range(args.runs):
+            state = await graph.ainvoke({"messages": [HumanMessage(content="oi")]}, config=cfg)
+
+            t0 = time.perf_counter()
+            from_state = await final_messages(saver, thread_id, state)
+            t_state += time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            from_checkpoint = await final_messages(saver, thread_id, None)
+            t_checkpoint += time.perf_counter() - t0
+
+            assert [m.id for m in from_state] == [m.id for m in from_checkpoint], "mensagens divergentes"
+
+        # o caminho de streaming pega o estado no on_chain_end da raiz
+        final_state = None
+        async for event in graph.astream_events({"messages": [HumanMessage(content="oi")]}, config=cfg):
+            if event.get("event") == "on_chain_end" and not event.get("parent_ids"):
+                final_state = event.get("data", {}).get("output")
+        streamed = await final_messages(saver, thread_id, final_state)
+        stream_ok = final_state is not None and [m.id for m in streamed] == [
+            m.id for m in await final_messages(saver, thread_id, None)
+        ]
+
+        backend = "postgres" if args.database_url else "memória"
+        print(f"checkpointer={backend} mensagens={len(from_state)} runs={args.runs}")
+        print(f"releitura do checkpoint: {t_checkpoint / args.runs * 1000:8.3f} ms/run")
+        print(f"estado do grafo:         {t_state / args.runs * 1000:8.3f} ms/run")
+        print(f"economia:                {(t_checkpoint - t_state) / args.runs * 1000:8.3f} ms/run")
+        print(f"stream usa on_chain_end: {'sim' if stream_ok else 'NÃO (fallback para checkpoint)'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mensagens", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--database-url", type=str, default=None)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
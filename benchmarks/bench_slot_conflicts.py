@@ -0,0 +1,93 @@
+"""
+Benchmark: checagem de conflito de slots (varredura linear x AgendaIndex).
+
+Uso:
+    python -m benchmarks.bench_slot_conflicts [--agendamentos 500] [--dias 14] [--profissionais 20]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+
+from app.services.agenda import AgendaIndex, agendamento_interval
+
+TZ = timezone(timedelta(hours=-3))
+SLOT_STEP_MIN = 30
+
+
+def _gen_agendamentos(n: int, dias: int, profs: int, seed: int = 7) -> List[Dict[str, Any]]:
+    rnd = random.Random(seed)
+    base = datetime(2026, 1, 5, tzinfo=TZ)
+    out = []
+    for i in range(n):
+        day = base + timedelta(days=rnd.randrange(dias))
+        start = day.replace(hour=9) + timedelta(minutes=15 * rnd.randrange(32))
+        out.append({
+            "id": i,
+            "dataHoraInicio": start.isoformat(),
+            "duracaoEmMinutos": rnd.choice([30, 45, 60, 90, 120]),
+            "profissional": {"id": rnd.randrange(profs)},
+        })
+    return out
+
+
+def _slots(dias: int, dur_min: int) -> List[Tuple[datetime, datetime]]:
+    base = datetime(2026, 1, 5, tzinfo=TZ)
+    out = []
+    for d in range(dias):
+        cursor = (base + timedelta(days=d)).replace(hour=9)
+        close = cursor.replace(hour=18)
+        while cursor + timedelta(minutes=dur_min) <= close:
+            out.append((cursor, cursor + timedelta(minutes=dur_min)))
+            cursor += timedelta(minutes=SLOT_STEP_MIN)
+    return out
+
+
+def _linear_is_free(slot_start, slot_end, agendamentos, profissional_id) -> bool:
+    # Implementação anterior: varre e re-parseia tudo a cada slot
+    for ag in agendamentos:
+        if (ag.get("profissional") or {}).get("id") != profissional_id:
+            continue
+        itv = agendamento_interval(ag)
+        if not itv:
+            continue
+        if slot_start < itv[1] and itv[0] < slot_end:
+            return False
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agendamentos", type=int, default=500)
+    parser.add_argument("--dias", type=int, default=14)
+    parser.add_argument("--profissionais", type=int, default=20)
+    parser.add_argument("--duracao", type=int, default=60)
+    args = parser.parse_args()
+
+    ags = _gen_agendamentos(args.agendamentos, args.dias, args.profissionais)
+    slots = _slots(args.dias, args.duracao)
+    checks = len(slots) * args.profissionais
+
+    t0 = time.perf_counter()
+    linear = [_linear_is_free(s, e, ags, p) for s, e in slots for p in range(args.profissionais)]
+    t_linear = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    index = AgendaIndex(ags)
+    t_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    indexed = [index.is_free(p, s, e) for s, e in slots for p in range(args.profissionais)]
+    t_index = time.perf_counter() - t0
+
+    assert linear == indexed, "resultados divergentes"
+    print(f"agendamentos={len(ags)} slots={len(slots)} profissionais={args.profissionais} checks={checks}")
+    print(f"linear:      {t_linear * 1000:9.1f} ms")
+    print(f"AgendaIndex: {(t_build + t_index) * 1000:9.1f} ms (build {t_build * 1000:.1f} ms)")
+    print(f"speedup:     {t_linear / max(t_build + t_index, 1e-9):9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
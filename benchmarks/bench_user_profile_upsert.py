@@ -0,0 +1,143 @@
+"""
+Benchmark/checagem de concorrência: POST /user-profiles em paralelo.
+
+Dispara --paralelos upserts simultâneos para cada um de --perfis perfis novos
+(metade por stack_user_id, metade por stack_user_id + customer_profile) e
+confere no banco que cada perfil terminou com exatamente uma linha. Também
+verifica o 409 quando os dois ids já pertencem a perfis diferentes.
+
+Os customer_profile usados ficam numa faixa alta (>= 2_000_000_000) e as
+linhas criadas são apagadas no fim.
+
+Uso:
+    python -m benchmarks.bench_user_profile_upsert --database-url postgresql://... [--perfis 50] [--paralelos 16]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from app.db.pool import close_pool, get_pool, init_pool, open_pool
+from app.db.user_profiles import upsert_user_profile
+
+_CUSTOMER_BASE = 2_000_000_000
+
+
+async def _count_rows(stack_ids: List[uuid.UUID], customers: List[int]) -> Tuple[Counter, Counter]:
+    async with get_pool().connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                select stack_user_id, customer_profile
+                  from user_profiles
+                 where stack_user_id = any(%s::uuid[])
+                    or customer_profile = any(%s::int[])
+                """,
+                ([str(s) for s in stack_ids], customers),
+            )
+            rows = await cur.fetchall()
+    by_stack = Counter(str(r[0]) for r in rows if r[0] is not None)
+    by_customer = Counter(r[1] for r in rows if r[1] is not None)
+    return by_stack, by_customer
+
+
+async def _cleanup(stack_ids: List[uuid.UUID], customers: List[int]) -> None:
+    async with get_pool().connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                delete from user_profiles
+                 where stack_user_id = any(%s::uuid[])
+                    or customer_profile = any(%s::int[])
+                """,
+                ([str(s) for s in stack_ids], customers),
+            )
+        await conn.commit()
+
+
+async def _upsert(stack_user_id: uuid.UUID, customer_profile: Optional[int], i: int) -> str:
+    outcome, _ = await upsert_user_profile(
+        stack_user_id=stack_user_id,
+        customer_profile=customer_profile,
+        name=f"bench {i}",
+        phone=None,
+    )
+    return outcome
+
+
+async def _run(args: argparse.Namespace) -> int:
+    init_pool(args.database_url, 1, args.pool_size)
+    await open_pool()
+
+    rnd = random.Random(args.seed)
+    stack_ids = [uuid.uuid4() for _ in range(args.perfis)]
+    customers = [_CUSTOMER_BASE + rnd.randrange(100_000_000) for _ in range(args.perfis)]
+    failures = 0
+    try:
+        calls = []
+        for n, (sid, cp) in enumerate(zip(stack_ids, customers)):
+            customer = cp if n % 2 else None
+            calls += [_upsert(sid, customer, i) for i in range(args.paralelos)]
+        rnd.shuffle(calls)
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*calls, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+
+        errors = [o for o in outcomes if isinstance(o, BaseException)]
+        counts = Counter(o for o in outcomes if isinstance(o, str))
+        print(
+            f"{len(calls)} upserts em {elapsed * 1000:.0f} ms "
+            f"({len(calls) / max(elapsed, 1e-9):.0f}/s)  {dict(counts)}  erros: {len(errors)}"
+        )
+        for e in errors[:5]:
+            print(f"  erro: {e!r}")
+        failures += len(errors)
+
+        if counts["created"] != args.perfis:
+            print(f"FALHA: esperado {args.perfis} 'created', obtido {counts['created']}")
+            failures += 1
+
+        by_stack, by_customer = await _count_rows(stack_ids, customers)
+        dup_stack = {k: v for k, v in by_stack.items() if v > 1}
+        dup_customer = {k: v for k, v in by_customer.items() if v > 1}
+        missing = [s for s in stack_ids if str(s) not in by_stack]
+        if dup_stack or dup_customer or missing:
+            print(f"FALHA: duplicados {dup_stack} {dup_customer}, ausentes {len(missing)}")
+            failures += 1
+        else:
+            print(f"ok: {args.perfis} perfis, uma linha cada")
+
+        # Os dois ids já pertencem a perfis diferentes: 409, nada muda
+        if args.perfis >= 3:
+            outcome = await _upsert(stack_ids[0], customers[1], -1)
+            if outcome != "conflict":
+                print(f"FALHA: esperado 'conflict', obtido {outcome!r}")
+                failures += 1
+            else:
+                print("ok: conflito detectado")
+    finally:
+        await _cleanup(stack_ids, customers)
+        await close_pool()
+
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Upserts concorrentes de user_profiles.")
+    parser.add_argument("--database-url", type=str, required=True)
+    parser.add_argument("--perfis", type=int, default=50)
+    parser.add_argument("--paralelos", type=int, default=16, help="upserts simultâneos por perfil")
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    sys.exit(asyncio.run(_run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
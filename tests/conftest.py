@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from app.db.migrator import run_migrations
+from app.db.pool import close_pool, init_pool, open_pool
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+async def database():
+    """
+    Pool aberto num Postgres de teste com as migrações aplicadas.
+    Precisa de TEST_DATABASE_URL; sem ela, os testes de banco são pulados.
+    """
+    database_url = os.getenv("TEST_DATABASE_URL")
+    if not database_url:
+        pytest.skip("TEST_DATABASE_URL não definida")
+    init_pool(database_url, 1, 10)
+    await open_pool()
+    try:
+        await run_migrations()
+        yield
+    finally:
+        await close_pool()
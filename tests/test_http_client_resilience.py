@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.utils.http_client import CircuitOpenError, HedgePolicy, HttpClient, HttpClientError, RetryPolicy
+
+pytestmark = pytest.mark.anyio
+
+BASE_URL = "http://stub.local"
+NO_WAIT = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+
+class StubServer:
+    """Servidor stub (httpx.MockTransport): responde com a fila de handlers, o último se repete."""
+
+    def __init__(self, *handlers) -> None:
+        self.handlers = list(handlers)
+        self.requests: list[httpx.Request] = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        handler = self.handlers.pop(0) if len(self.handlers) > 1 else self.handlers[0]
+        return await handler(request)
+
+    @property
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self)
+
+
+def status(code: int, delay: float = 0.0):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if delay:
+            await asyncio.sleep(delay)
+        return httpx.Response(code, json={"status": code})
+
+    return handler
+
+
+@pytest.fixture(autouse=True)
+def _env(monkeypatch):
+    monkeypatch.setenv("HTTP_CACHE_ENABLED", "false")
+    monkeypatch.setenv("HTTP_CB_FAILURE_THRESHOLD", "5")
+    monkeypatch.setenv("HTTP_CB_RESET_SECONDS", "0.05")
+
+
+@pytest.fixture
+def low_threshold(monkeypatch):
+    monkeypatch.setenv("HTTP_CB_FAILURE_THRESHOLD", "2")
+
+
+def _client(server: StubServer, retry: RetryPolicy = NO_WAIT, hedge: HedgePolicy = HedgePolicy()) -> HttpClient:
+    return HttpClient(base_url=BASE_URL, transport=server.transport, retry=retry, hedge=hedge)
+
+
+# -----------------------------
+# Retry
+# -----------------------------
+async def test_get_retries_5xx_until_success():
+    server = StubServer(status(503), status(502), status(200))
+    client = _client(server)
+
+    assert await client.aget("/servicos") == {"status": 200}
+    assert len(server.requests) == 3
+    assert client.stats["retries"] == 2
+
+
+async def test_get_gives_up_after_max_attempts():
+    server = StubServer(status(503))
+    client = _client(server)
+
+    with pytest.raises(HttpClientError):
+        await client.aget("/servicos")
+    assert len(server.requests) == 3
+
+
+async def test_post_is_not_retried():
+    server = StubServer(status(503))
+    client = _client(server)
+
+    with pytest.raises(HttpClientError):
+        await client.apost("/agendamentos", json={})
+    assert len(server.requests) == 1
+
+
+# -----------------------------
+# Circuit breaker
+# -----------------------------
+async def test_breaker_opens_after_threshold_and_fails_fast(low_threshold):
+    server = StubServer(status(500))
+    client = _client(server, retry=NO_RETRY)
+
+    for _ in range(2):
+        with pytest.raises(HttpClientError):
+            await client.aget("/profissionais")
+    assert client._breaker("GET /profissionais").state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        await client.aget("/profissionais")
+    assert len(server.requests) == 2
+    assert client.stats["circuit_rejections"] == 1
+
+
+async def test_breaker_half_open_probe_success_closes(low_threshold):
+    server = StubServer(status(500), status(500), status(200))
+    client = _client(server, retry=NO_RETRY)
+    for _ in range(2):
+        with pytest.raises(HttpClientError):
+            await client.aget("/profissionais")
+
+    await asyncio.sleep(0.06)
+    assert await client.aget("/profissionais") == {"status": 200}
+    assert client._breaker("GET /profissionais").state == "closed"
+
+
+async def test_breaker_half_open_probe_failure_reopens(low_threshold):
+    server = StubServer(status(500))
+    client = _client(server, retry=NO_RETRY)
+    for _ in range(2):
+        with pytest.raises(HttpClientError):
+            await client.aget("/profissionais")
+
+    await asyncio.sleep(0.06)
+    with pytest.raises(HttpClientError):
+        await client.aget("/profissionais")
+    assert client._breaker("GET /profissionais").state == "open"
+    with pytest.raises(CircuitOpenError):
+        await client.aget("/profissionais")
+    assert len(server.requests) == 3
+
+
+async def test_breaker_half_open_allows_a_single_probe(low_threshold):
+    server = StubServer(status(500), status(500), status(200, delay=0.05))
+    client = _client(server, retry=NO_RETRY)
+    for _ in range(2):
+        with pytest.raises(HttpClientError):
+            await client.aget("/profissionais")
+
+    await asyncio.sleep(0.06)
+    probe = asyncio.create_task(client.aget("/profissionais"))
+    await asyncio.sleep(0.01)
+    # params diferentes: não pega carona no GET em voo (coalescing)
+    with pytest.raises(CircuitOpenError):
+        await client.aget("/profissionais", params={"page": 2})
+    assert await probe == {"status": 200}
+    assert client._breaker("GET /profissionais").state == "closed"
+
+
+# -----------------------------
+# Hedge
+# -----------------------------
+async def test_hedged_get_uses_fast_copy_and_cancels_slow_one():
+    cancelled = asyncio.Event()
+
+    async def slow(request: httpx.Request) -> httpx.Response:
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return httpx.Response(200, json={"from": "slow"})
+
+    async def fast(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"from": "fast"})
+
+    server = StubServer(fast, slow, fast)
+    hedge = HedgePolicy(enabled=True, percentile=50, min_samples=1, min_delay=0.02)
+    client = _client(server, hedge=hedge)
+
+    # primeira chamada só alimenta a janela de latência (sem hedge)
+    assert await client.aget("/agendamentos") == {"from": "fast"}
+    assert client.stats["hedged"] == 0
+
+    result = await asyncio.wait_for(client.aget("/agendamentos", params={"page": 2}), timeout=1)
+    assert result == {"from": "fast"}
+    assert client.stats["hedged"] == 1
+    assert client.stats["hedge_wins"] == 1
+    assert cancelled.is_set()
+    assert len(server.requests) == 3
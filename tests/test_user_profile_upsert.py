@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import uuid
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.routers.user_profiles import router
+from app.db.pool import get_pool
+from app.db.user_profiles import upsert_user_profile
+
+pytestmark = pytest.mark.anyio
+
+CONCURRENCY = 20
+# faixa alta de customer_profile para não colidir com dados reais
+_CUSTOMER_BASE = 2_000_000_000
+
+
+def _customer() -> int:
+    return _CUSTOMER_BASE + random.randrange(100_000_000)
+
+
+async def _cleanup(stack_ids, customers) -> None:
+    async with get_pool().connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                delete from user_profiles
+                 where stack_user_id = any(%s::uuid[])
+                    or customer_profile = any(%s::int[])
+                """,
+                ([str(s) for s in stack_ids], customers),
+            )
+        await conn.commit()
+
+
+async def _count(stack_user_id, customer_profile) -> int:
+    async with get_pool().connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "select count(*) from user_profiles where stack_user_id = %s or customer_profile = %s",
+                (str(stack_user_id), customer_profile),
+            )
+            return (await cur.fetchone())[0]
+
+
+async def test_concurrent_upserts_same_key_create_once(database):
+    stack_user_id, customer_profile = uuid.uuid4(), _customer()
+    try:
+        results = await asyncio.gather(*(
+            upsert_user_profile(
+                stack_user_id=stack_user_id,
+                customer_profile=customer_profile,
+                name=f"teste {i}",
+                phone=None,
+            )
+            for i in range(CONCURRENCY)
+        ))
+        outcomes = [outcome for outcome, _ in results]
+        assert outcomes.count("created") == 1
+        assert outcomes.count("updated") == CONCURRENCY - 1
+        assert len({row.id for _, row in results}) == 1
+        assert await _count(stack_user_id, customer_profile) == 1
+    finally:
+        await _cleanup([stack_user_id], [customer_profile])
+
+
+async def test_cross_key_conflict_returns_409(database):
+    stack_a, customer_a = uuid.uuid4(), _customer()
+    stack_b, customer_b = uuid.uuid4(), _customer()
+    app = FastAPI()
+    app.include_router(router)
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            for stack, customer in ((stack_a, customer_a), (stack_b, customer_b)):
+                resp = await client.post(
+                    "/user-profiles",
+                    json={"stack_user_id": str(stack), "customer_profile": customer},
+                )
+                assert resp.status_code == 200
+
+            # stack_user_id de um perfil + customer_profile de outro
+            resp = await client.post(
+                "/user-profiles",
+                json={"stack_user_id": str(stack_a), "customer_profile": customer_b},
+            )
+            assert resp.status_code == 409
+        assert await _count(stack_a, customer_a) == 1
+        assert await _count(stack_b, customer_b) == 1
+    finally:
+        await _cleanup([stack_a, stack_b], [customer_a, customer_b])